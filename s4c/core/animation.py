@@ -0,0 +1,194 @@
+"""! @brief Compact in-memory representation of converted frames."""
+
+##
+# @file animation.py
+#
+# @brief Compact in-memory representation of converted frames.
+#
+# @section description_animation Description
+# A Frame stores one palette index per pixel in a bytes plane, so it takes roughly
+# width * height bytes. All frames of an Animation share a single interned palette,
+# and the char encoding is only done when the frame rows get printed.
+#
+# The interned palettes and their char tables are kept for the last MAX_PALETTES palettes
+# used, so long running processes like watch don't keep every palette they ever saw.
+#
+# @section libraries_main Libraries/Modules
+# - functools standard library (https://docs.python.org/3/library/functools.html)
+#   - Access to lru_cache.
+#
+# @section notes_animation Notes
+# - Frames are expected to come from 'P' mode images, with at most 256 colors.
+#
+# @section todo_animation TODO
+#
+# @section author_animation Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+import functools
+from .utils import new_char_map
+
+## Palettes kept interned, with their char tables. Least recently used go first.
+MAX_PALETTES = 64
+
+@functools.lru_cache(maxsize=MAX_PALETTES)
+def _interned(palette):
+    return palette
+
+def intern_palette(rgb_palette):
+    """! Returns the shared tuple for the passed rgb palette.
+    @param rgb_palette   A sequence of (r,g,b) colors.
+    @return  The interned tuple of (r,g,b) tuples.
+    """
+    return _interned(tuple(tuple(color) for color in rgb_palette))
+
+@functools.lru_cache(maxsize=MAX_PALETTES)
+def palette_char_table(palette):
+    """! Returns the str.translate() table mapping the indexes of an interned palette to chars.
+    Animations with the same palette share one table.
+    """
+    char_map = new_char_map(palette)
+    return {idx: char_map[color] for idx, color in enumerate(palette)}
+
+def palette_from_flat(flat_palette):
+    """! Returns the interned rgb palette for a flat [r,g,b,r,g,b...] list, as from getpalette()."""
+    return intern_palette(zip(flat_palette[0::3], flat_palette[1::3], flat_palette[2::3]))
+
+class Frame:
+    """! A single frame: palette indexes for each pixel, row by row."""
+    __slots__ = ("indexes", "width", "height", "palette")
+
+    def __init__(self, indexes, width, height, palette):
+        """! Builds a frame.
+        @param indexes   The palette index plane, width * height bytes.
+        @param width   The frame width.
+        @param height   The frame height.
+        @param palette   The rgb palette, interned if it was not already.
+        """
+        self.indexes = bytes(indexes)
+        self.width = width
+        self.height = height
+        self.palette = intern_palette(palette)
+
+    def __reduce__(self):
+        # Rebuild through __init__, so that unpickled palettes get interned again
+        return (Frame, (self.indexes, self.width, self.height, self.palette))
+
+    @classmethod
+    def from_image(cls, img):
+        """! Builds a frame from a 'P' mode image."""
+        return cls(img.tobytes(), img.size[0], img.size[1], palette_from_flat(img.getpalette()))
+
+    @property
+    def palette_size(self):
+        """! The number of colors in the frame palette."""
+        return len(self.palette)
+
+    def rows(self):
+        """! Yields the index plane one row at a time."""
+        view = memoryview(self.indexes)
+        for y in range(self.height):
+            yield view[y * self.width:(y + 1) * self.width]
+
+    def encode(self, char_table):
+        """! Returns the frame as a list of strings, one per row.
+        @param char_table   A str.translate() table from palette index to char.
+        """
+        return [bytes(row).decode("latin-1").translate(char_table) for row in self.rows()]
+
+class Animation:
+    """! A sequence of frames sharing the same palette and size."""
+    __slots__ = ("frames", "palette", "width", "height", "_char_table")
+
+    def __init__(self):
+        """! Builds an empty animation. The first appended frame sets palette and size."""
+        self.frames = []
+        self.palette = None
+        self.width = 0
+        self.height = 0
+        self._char_table = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    @property
+    def palette_size(self):
+        """! The number of colors in the shared palette."""
+        return len(self.palette) if self.palette is not None else 0
+
+    def mismatch(self, frame):
+        """! Checks the passed frame against the animation.
+        @param frame   The frame to check.
+        @return  None if the frame fits, else a tuple of: (what, expected, found).
+        """
+        if not self.frames:
+            return None
+        if frame.palette is not self.palette and frame.palette != self.palette:
+            return ("palette", list(self.palette), list(frame.palette))
+        if frame.width != self.width:
+            return ("width", self.width, frame.width)
+        if frame.height != self.height:
+            return ("height", self.height, frame.height)
+        return None
+
+    @classmethod
+    def from_frames(cls, frames):
+        """! Builds an animation from frames already checked by validate_frames()."""
+        animation = cls()
+        for frame in frames:
+            animation.append(frame)
+        return animation
+
+    def append(self, frame):
+        """! Appends a frame. The caller is expected to check mismatch() first."""
+        if not self.frames:
+            self.palette = frame.palette
+            self.width = frame.width
+            self.height = frame.height
+        self.frames.append(frame)
+
+    def sizes(self):
+        """! Returns the sizes tuple expected by print_heading()."""
+        return (len(self.frames), self.palette_size, self.width, self.height)
+
+    def used_indexes(self):
+        """! Returns the sorted palette indexes used by at least one frame."""
+        used = set()
+        for frame in self.frames:
+            used.update(frame.indexes)
+        return sorted(used)
+
+    def compacted(self):
+        """! Returns an animation using only the palette colors found in the frames.
+        Colors keep their palette order, and duplicate colors are merged.
+        Returns self if the palette is already compact.
+        """
+        colors = {}
+        table = bytearray(range(256))
+        for idx in self.used_indexes():
+            table[idx] = colors.setdefault(self.palette[idx], len(colors))
+        palette = intern_palette(colors)
+        if palette == self.palette:
+            return self
+        compact = Animation()
+        for frame in self.frames:
+            compact.append(Frame(frame.indexes.translate(table), frame.width, frame.height,
+                                 palette))
+        return compact
+
+    def char_table(self):
+        """! Returns the str.translate() table mapping palette indexes to chars.
+        Animations with the same palette share one table, see palette_char_table().
+        """
+        if self._char_table is None:
+            self._char_table = palette_char_table(self.palette)
+        return self._char_table
+
+    def encoded_frames(self):
+        """! Yields the char rows of each frame, encoded with the shared char table."""
+        table = self.char_table()
+        for frame in self.frames:
+            yield frame.encode(table)
@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+"""! @brief Program that packs sprite directories and animations into a single atlas image."""
+
+##
+# @file atlas.py
+#
+# @brief Program that packs sprite directories and animations into a single atlas image.
+#
+# @section description_atlas Description
+# Each animation (a sprites directory, or a multi-frame image) gets a region of the atlas,
+# where its frames are laid out as a regular spritesheet, row by row. Regions are placed
+# on shelves, tallest first, with the separator size between them.
+#
+# The index is written next to the atlas, with the same name and a .json extension:
+#
+#     {
+#       "version": "0.1.0",
+#       "atlas": "game.png",
+#       "animations": {
+#         "walk_cycle": { "geometry": [16, 12, 1, 0, 0], "columns": 4, "frames": 16,
+#                         "alpha": false }
+#       }
+#     }
+#
+# The geometry holds the sheet_converter and cut_sheet arguments, in atlas coordinates:
+# sprite width, sprite height, separator size, start X, start Y.
+# Columns and frames limit the grid to the animation region.
+# Alpha tells if any frame of the animation has transparency: opaque animations are converted
+# without the alpha band of an RGBA atlas, so they convert the same as in an all-opaque one.
+# Animations of indexed frames sharing one palette also get a "palette" entry, the flat
+# [r,g,b,r,g,b...] list of it: their cells are mapped back to it when converted, so they
+# get the same palette indexes as their frames.
+#
+# @section libraries_main Libraries/Modules
+# - Pillow (https://pillow.readthedocs.io/en/stable/)
+#   - Access to image manipulation functions.
+# - json standard library (https://docs.python.org/3/library/json.html)
+#   - Access to index output.
+# - math standard library (https://docs.python.org/3/library/math.html)
+#   - Access to ceil and sqrt.
+# - sys standard library (https://docs.python.org/3/library/sys.html)
+#   - Access to command line arguments.
+# - os standard library (https://docs.python.org/3/library/os.html)
+#   - Access to program name.
+#
+# @section notes_atlas Notes
+# - The atlas is RGBA if any animation has transparency, else RGB.
+#
+# @section todo_atlas TODO
+#
+# @section author_atlas Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import json
+import math
+import os
+import sys
+from PIL import Image
+from PIL import ImageSequence
+from .utils import SheetArgs
+from .utils import log_wrong_argnum
+from .utils import pop_option
+from .sprites import sprite_files
+
+SCRIPT_VERSION = "0.1.0"
+## The index format version.
+INDEX_VERSION = "0.1.0"
+F_STRING_ARGS = "[--sep <separator_size>] <atlas.png> <sprites_directory | animation.gif> [...]"
+DEFAULT_SEP = 1
+EXPECTED_ARGS = 2
+
+# Functions
+def usage():
+    """! Prints correct invocation."""
+    print("Wrong arguments. Needed: atlas file, at least one sprites directory or animation")
+    print(f"\nUsage:\tpython {os.path.basename(__file__)} {F_STRING_ARGS}")
+    print(f"\n  --sep:\tpixels between frames and animations, default {DEFAULT_SEP}")
+    sys.exit(1)
+
+def has_alpha(img):
+    """! Checks if an opened image has transparency."""
+    return img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+
+class AtlasSource:
+    """! An animation to pack: a sprites directory, or a multi-frame image."""
+
+    def __init__(self, path):
+        """! Reads the frame count, size and transparency. Sprite files are not decoded.
+        @param path   The sprites directory, or the image file.
+        """
+        self.path = path
+        self.files = None
+        if os.path.isfile(path):
+            self.name = os.path.splitext(os.path.basename(path))[0].replace("-","_")
+            with Image.open(path) as img:
+                self.count = getattr(img, "n_frames", 1)
+                self.size = img.size
+        else:
+            self.name = os.path.basename(os.path.normpath(path)).replace("-","_")
+            self.files = sprite_files(path)
+            self.count = len(self.files)
+            self.size = (0, 0)
+            if self.files:
+                with Image.open(self.files[0]) as img:
+                    self.size = img.size
+        # Any frame can be the transparent one
+        self.alpha = any(has_alpha(img) for img in self.images())
+        ## The palette shared by indexed frames, as a flat list. Set by paste_frames().
+        self.palette = None
+
+    @property
+    def columns(self):
+        """! The frames in each row of the region, about as many as the rows."""
+        return max(1, math.ceil(math.sqrt(self.count)))
+
+    def region_size(self, sep):
+        """! Returns the size of the atlas region holding all the frames."""
+        (width, height) = self.size
+        rows = -(-self.count // self.columns)
+        return (self.columns * (width + sep) - sep, rows * (height + sep) - sep)
+
+    def images(self):
+        """! Yields the frames in order, decoding one at a time."""
+        if self.files is None:
+            with Image.open(self.path) as img:
+                yield from ImageSequence.Iterator(img)
+            return
+        for file in self.files:
+            with Image.open(file) as img:
+                yield img
+
+def shelf_layout(sizes, sep):
+    """! Places rectangles on shelves, tallest first.
+    @param sizes   The (width, height) of each rectangle.
+    @param sep   The space between rectangles.
+    @return  A tuple of: the atlas size, the (x, y) of each rectangle in input order.
+    """
+    area = sum((width + sep) * (height + sep) for width, height in sizes)
+    max_width = max(max(width for width, _ in sizes), math.isqrt(area))
+    positions = [None] * len(sizes)
+    (x, y, shelf_height, atlas_width) = (0, 0, 0, 0)
+    for idx in sorted(range(len(sizes)), key=lambda idx: -sizes[idx][1]):
+        (width, height) = sizes[idx]
+        if x > 0 and x + width > max_width:
+            (x, y, shelf_height) = (0, y + shelf_height + sep, 0)
+        positions[idx] = (x, y)
+        atlas_width = max(atlas_width, x + width)
+        shelf_height = max(shelf_height, height)
+        x += width + sep
+    return ((atlas_width, y + shelf_height), positions)
+
+def index_path(atlas_path):
+    """! Returns the index file name for an atlas."""
+    return os.path.splitext(atlas_path)[0] + ".json"
+
+def check_sources(sources):
+    """! Checks that every source has frames, and that animation names are unique."""
+    names = set()
+    for src in sources:
+        if src.count == 0:
+            print(f"[ERROR] No frames found in {src.path}.")
+            return False
+        if src.name in names:
+            print(f"[ERROR] Two animations are named {src.name}, at {src.path}.")
+            return False
+        names.add(src.name)
+    return True
+
+def paste_frames(atlas, src, origin, sep):
+    """! Pastes the frames of a source in its atlas region, row by row.
+    @param atlas   The atlas image.
+    @param src   The AtlasSource.
+    @param origin   The (x, y) of the region.
+    @param sep   The pixels between frames.
+    @return  False if a frame size doesn't match the first one.
+    """
+    (width, height) = src.size
+    palettes = set()
+    for idx, frame in enumerate(src.images()):
+        if frame.size != src.size:
+            print(f"[ERROR] at frame #{idx} of {src.path}: size mismatch\n")
+            print(f"\texpected: {src.size}\n\tfound: {frame.size}\n")
+            return False
+        palettes.add(tuple(frame.getpalette()) if frame.mode == 'P' else None)
+        (row, col) = divmod(idx, src.columns)
+        atlas.paste(frame.convert(atlas.mode),
+                    (origin[0] + col * (width + sep), origin[1] + row * (height + sep)))
+    # Pasting drops the palette: frames sharing one get it back when converted
+    if len(palettes) == 1 and None not in palettes:
+        src.palette = list(palettes.pop())
+    return True
+
+def pack_atlas(atlas_path, paths, sep=DEFAULT_SEP):
+    """! Packs the frames of each path in an atlas, then writes the atlas and its index.
+    @param atlas_path   The output atlas image.
+    @param paths   The sprites directories, or multi-frame images.
+    @param sep   The pixels between frames and between animations.
+    @return  False if some source could not be packed.
+    """
+    sources = [AtlasSource(path) for path in paths]
+    if not check_sources(sources):
+        return False
+    (size, positions) = shelf_layout([src.region_size(sep) for src in sources], sep)
+    atlas = Image.new('RGBA' if any(src.alpha for src in sources) else 'RGB', size)
+
+    animations = {}
+    for src, origin in zip(sources, positions):
+        if not paste_frames(atlas, src, origin, sep):
+            return False
+        animations[src.name] = {"geometry": [src.size[0], src.size[1], sep, *origin],
+                                "columns": src.columns, "frames": src.count,
+                                "alpha": src.alpha}
+        if src.palette is not None:
+            animations[src.name]["palette"] = src.palette
+    atlas.save(atlas_path)
+
+    index = {"version": INDEX_VERSION, "atlas": os.path.basename(atlas_path),
+             "animations": animations}
+    with open(index_path(atlas_path), "w", encoding="utf-8") as index_fp:
+        json.dump(index, index_fp, separators=(",", ":"))
+        index_fp.write("\n")
+    total = sum(src.count for src in sources)
+    print(f"Packed {total} frames of {len(sources)} animations in {atlas_path},",
+          f"{size[0]}x{size[1]}, index: {index_path(atlas_path)}")
+    return True
+
+def atlas_entry(index_file, name):
+    """! Looks up an animation in an atlas index.
+    @param index_file   The atlas index file.
+    @param name   The animation name.
+    @return  A tuple of: atlas image file, SheetArgs of the animation, whether the animation
+             has transparency, the flat palette of its indexed frames (None if they were not
+             indexed). None if missing.
+    """
+    with open(index_file, encoding="utf-8") as index_fp:
+        index = json.load(index_fp)
+    entry = index["animations"].get(name)
+    if entry is None:
+        print(f"[ERROR] No animation named {name} in {index_file}.")
+        print(f"Found: {', '.join(index['animations'])}")
+        return None
+    atlas = os.path.join(os.path.dirname(index_file), index["atlas"])
+    # Indexes without alpha don't tell: their cells are kept as they are
+    return (atlas, SheetArgs(*entry["geometry"], entry["columns"], entry["frames"]),
+            entry.get("alpha", True), entry.get("palette"))
+
+def main(argv):
+    """! Main program entry."""
+    (sep, argv) = pop_option(argv, "--sep")
+    if len(argv) == 2 and argv[1] in ('version', '-v', '--version'):
+        print(f"pack v{SCRIPT_VERSION}")
+        print(f"INDEX_VERSION v{INDEX_VERSION}")
+        sys.exit(0)
+    if len(argv) - 1 < EXPECTED_ARGS:
+        log_wrong_argnum(EXPECTED_ARGS, argv)
+        usage()
+    if not pack_atlas(argv[1], argv[2:], int(sep) if sep is not None else DEFAULT_SEP):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,189 @@
+"""! @brief Reads a spritesheet one row of cells at a time."""
+
+##
+# @file bands.py
+#
+# @brief Reads a spritesheet one row of cells at a time.
+#
+# @section description_bands Description
+# Non-interlaced, 8 bit per channel PNGs are decoded incrementally: the IDAT stream is
+# inflated with zlib and only the scanlines up to the end of the current row of cells
+# are kept, then handed to Pillow's PNG row decoder to undo the filters.
+# The last decoded scanline is kept as reference for the next band, since PNG filters
+# refer to the previous row.
+# Other images are loaded whole and cropped, so callers can use the same loop.
+#
+# Peak memory is then about sheet width * (sprite height + separator size).
+#
+# @section libraries_main Libraries/Modules
+# - Pillow (https://pillow.readthedocs.io/en/stable/)
+#   - Access to image manipulation functions.
+# - struct standard library (https://docs.python.org/3/library/struct.html)
+#   - Access to PNG chunk headers.
+# - zlib standard library (https://docs.python.org/3/library/zlib.html)
+#   - Access to IDAT inflating.
+#
+# @section notes_bands Notes
+# - Row and column counts follow the same formula used by cut_sheet and sheet_converter.
+# - Geometries with columns and frames set (atlas regions) stop at the last frame.
+#
+# @section todo_bands TODO
+#
+# @section author_bands Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import struct
+import zlib
+from PIL import Image
+from .utils import SheetArgs
+
+## Rawmodes that can be streamed, with their bytes per pixel.
+STREAM_RAWMODES = {"L": 1, "P": 1, "LA": 2, "RGB": 3, "RGBA": 4}
+## Bytes read from the sheet file at a time.
+READ_SIZE = 1 << 16
+
+def sheet_grid(size, s: SheetArgs):
+    """! Returns the (rows, columns) of cells found in a sheet of the passed size.
+    Columns and frames set in the geometry limit the grid to a region of the sheet.
+    """
+    columns = (size[0] - s.start_x + s.sep_size) // (s.sprite_width + s.sep_size)
+    rows = (size[1] - s.start_y + s.sep_size) // (s.sprite_height + s.sep_size)
+    if s.columns:
+        columns = min(columns, s.columns)
+    if s.frames and columns > 0:
+        rows = min(rows, -(-s.frames // columns))
+    return (rows, columns)
+
+def row_cells(row, columns, s: SheetArgs):
+    """! Returns the number of cells in a row of the grid, the last one may be partial."""
+    if s.frames:
+        return max(0, min(columns, s.frames - row * columns))
+    return columns
+
+def band_cells(band, columns, s: SheetArgs):
+    """! Yields the cells in a band, left to right.
+    @param band   An image holding one row of cells, sprite_height tall.
+    @param columns   The number of cells in the row.
+    """
+    for col in range(columns):
+        spr_x = s.start_x + col * (s.sprite_width + s.sep_size)
+        yield band.crop((spr_x, 0, spr_x + s.sprite_width, s.sprite_height))
+
+def can_stream(img):
+    """! Checks if an opened image can be decoded band by band."""
+    if img.format != "PNG" or img.info.get("interlace") or len(img.tile) != 1:
+        return False
+    tile = img.tile[0]
+    return tile[0] == "zip" and tile[3] in STREAM_RAWMODES
+
+def _idat_pieces(fp):
+    """! Yields the IDAT payload of an open PNG file, a piece at a time."""
+    fp.seek(8)
+    while True:
+        header = fp.read(8)
+        if len(header) < 8:
+            return
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type == b"IEND":
+            return
+        if chunk_type != b"IDAT":
+            fp.seek(length + 4, 1)
+            continue
+        while length > 0:
+            piece = fp.read(min(length, READ_SIZE))
+            if not piece:
+                return
+            length -= len(piece)
+            yield piece
+        fp.seek(4, 1) # CRC
+
+def _scanlines(fp, line_size):
+    """! Yields raw filtered scanlines (filter byte included) from an open PNG file."""
+    inflater = zlib.decompressobj()
+    pending = bytearray()
+    # Sheets of flat colors compress well: a piece can inflate to many bands, so it's
+    # inflated a bit at a time
+    limit = max(READ_SIZE, line_size)
+    for piece in _idat_pieces(fp):
+        data = inflater.decompress(piece, limit)
+        while data:
+            pending += data
+            full = len(pending) - len(pending) % line_size
+            for start in range(0, full, line_size):
+                yield bytes(pending[start:start + line_size])
+            del pending[:full]
+            data = inflater.decompress(inflater.unconsumed_tail, limit)
+
+def _decode_rows(img, rawmode, lines, previous):
+    """! Undoes PNG filtering for the passed scanlines.
+    @param img   The lazily opened sheet, for mode, palette and info.
+    @param rawmode   The PNG rawmode.
+    @param lines   The filtered scanlines to decode.
+    @param previous   The unfiltered scanline before the first one, or None.
+    @return  An image with the decoded rows.
+    """
+    data = b"".join(lines)
+    height = len(lines)
+    if previous is not None:
+        data = b"\x00" + previous + data
+        height += 1
+    rows = Image.frombytes(img.mode, (img.size[0], height), zlib.compress(data, 0), "zip", rawmode)
+    if previous is not None:
+        rows = rows.crop((0, 1, img.size[0], height))
+    if img.palette is not None and img.mode == "P":
+        rows.putpalette(img.palette.palette, img.palette.mode)
+    rows.info.update(img.info)
+    return rows
+
+def _stream_bands(filename, img, s: SheetArgs, rows):
+    """! Yields each band of the passed sheet, decoding only the scanlines it needs."""
+    rawmode = img.tile[0][3]
+    line_size = img.size[0] * STREAM_RAWMODES[rawmode] + 1
+    previous = None
+    pending = []
+    band_row = 0
+    band_end = s.start_y + s.sprite_height
+    with open(filename, "rb") as fp:
+        for y, line in enumerate(_scanlines(fp, line_size)):
+            pending.append(line)
+            if y + 1 < band_end:
+                continue
+            decoded = _decode_rows(img, rawmode, pending, previous)
+            previous = decoded.crop((0, len(pending) - 1, img.size[0],
+                                     len(pending))).tobytes("raw", rawmode)
+            yield (band_row, decoded.crop((0, len(pending) - s.sprite_height,
+                                           img.size[0], len(pending))))
+            del decoded
+            pending = []
+            band_row += 1
+            if band_row == rows:
+                return
+            band_end += s.sprite_height + s.sep_size
+
+def iter_bands(filename, s: SheetArgs):
+    """! Yields (row index, band) for each row of cells in the sheet.
+    Each band is a full width image, sprite_height tall.
+    @param filename   The input spritesheet file.
+    @param s   The sheet geometry.
+    """
+    with Image.open(filename) as img:
+        rows = sheet_grid(img.size, s)[0]
+        if rows <= 0:
+            return
+        if can_stream(img):
+            yield from _stream_bands(filename, img, s, rows)
+            return
+        img.load()
+        for row in range(rows):
+            spr_y = s.start_y + row * (s.sprite_height + s.sep_size)
+            yield (row, img.crop((0, spr_y, img.size[0], spr_y + s.sprite_height)))
+
+def iter_band_cells(filename, s: SheetArgs):
+    """! Yields (row index, column index, cell) for each cell in the sheet, band by band."""
+    with Image.open(filename) as img:
+        columns = sheet_grid(img.size, s)[1]
+    for row, band in iter_bands(filename, s):
+        for col, cell in enumerate(band_cells(band, row_cells(row, columns, s), s)):
+            yield (row, col, cell)
+        del band
@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+"""! @brief Program that converts every target of a project config once."""
+
+##
+# @file batch.py
+#
+# @brief Program that converts every target of a project config once.
+#
+# @section description_batch Description
+# Reads the same JSON config as watch, and generates every output once, as watch does
+# at startup. Output files are only rewritten when their content changes.
+#
+# With --shard i/N, only the targets whose path (relative to the config) hashes to shard i
+# are built, see shard.py. Their outputs are final, except for the shared palettes: each
+# shard writes the palettes of its targets as a partial, and merge --config writes the
+# shared files from the partials of all the shards.
+#
+# @section libraries_main Libraries/Modules
+# - sys standard library (https://docs.python.org/3/library/sys.html)
+#   - Access to command line arguments.
+# - os standard library (https://docs.python.org/3/library/os.html)
+#   - Access to program name.
+#
+# @section notes_batch Notes
+# - Exits with 1 if some target could not be converted.
+#
+# @section todo_batch TODO
+#
+# @section author_batch Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import os
+import sys
+from .watch import load_config
+from .watch import SharedPalettesTarget
+from .shard import shard_option
+from .shard import in_shard
+from .shard import write_partial
+from .shard import palettes_partial_path
+from .shard import merge_palettes
+
+SCRIPT_VERSION = "0.1.0"
+F_STRING_ARGS = "[--shard <i>/<N>] <config.json>"
+EXPECTED_ARGS = 1
+
+# Functions
+def usage():
+    """! Prints correct invocation."""
+    print("Wrong arguments. Needed: config file.")
+    print(f"\nUsage:\tpython {os.path.basename(__file__)} {F_STRING_ARGS}")
+    print("\n  --shard:\tbuild only the targets of shard i out of N")
+    sys.exit(1)
+
+class PartialPalettesTarget(SharedPalettesTarget):
+    """! The shared palettes of the targets in a shard, written as a partial for merge."""
+
+    def __init__(self, shared, shard, targets):
+        super().__init__(shared.outputs, shared.s4c_path, targets)
+        self.shard = shard
+        self.tag = shared.tag
+
+    def build(self):
+        if not self.prepare():
+            return False
+        path = palettes_partial_path(self.outputs["C-header"], self.shard)
+        with open(path, "w", encoding="utf-8") as partial_fp:
+            write_partial({"kind": "palettes", "shard": list(self.shard),
+                           "palettes": self.palettes}, partial_fp)
+        print(f"[{self.tag}] {self.source}: wrote {path}")
+        return True
+
+class MergedPalettesTarget(SharedPalettesTarget):
+    """! The shared palettes, read from the partials of every shard."""
+
+    def __init__(self, shared):
+        super().__init__(shared.outputs, shared.s4c_path, [])
+        self.tag = shared.tag
+
+    def prepare(self):
+        self.palettes = merge_palettes(self.outputs["C-header"])
+        return self.palettes is not None
+
+def shard_targets(targets, config_path, shard):
+    """! Returns the targets of a shard, by their source path relative to the config.
+    The shared palettes, if any, become a PartialPalettesTarget of the shard targets.
+    """
+    base = os.path.dirname(os.path.abspath(config_path))
+    selected = [target for target in targets if not isinstance(target, SharedPalettesTarget)
+                and in_shard(os.path.relpath(target.source, base).replace(os.sep, "/"), shard)]
+    for target in targets:
+        if isinstance(target, SharedPalettesTarget):
+            selected.append(PartialPalettesTarget(target, shard, selected))
+    return selected
+
+def merged_palettes_target(config_path):
+    """! Returns the MergedPalettesTarget for a config. Exits if it has no shared palettes."""
+    targets = load_config(config_path, tag="merge")
+    if not targets or not isinstance(targets[-1], SharedPalettesTarget):
+        print(f"[ERROR] No shared_palettes in {config_path}.")
+        sys.exit(1)
+    return MergedPalettesTarget(targets[-1])
+
+def build_targets(targets):
+    """! Builds every target, in order.
+    @return  The number of targets that could not be built.
+    """
+    failed = 0
+    for target in targets:
+        if not target.build():
+            failed += 1
+    return failed
+
+def main(argv):
+    """! Main program entry."""
+    (shard, argv) = shard_option(argv)
+    if len(argv) == 2 and argv[1] in ('version', '-v', '--version'):
+        print(f"batch v{SCRIPT_VERSION}")
+        sys.exit(0)
+    if len(argv) - 1 != EXPECTED_ARGS:
+        print(f"Wrong number of arguments. Expected {EXPECTED_ARGS}, got {len(argv)-1}.")
+        print(f"--> {argv[1:]}\n")
+        usage()
+    targets = load_config(argv[1], tag="batch")
+    if shard is not None:
+        targets = shard_targets(targets, argv[1], shard)
+    failed = build_targets(targets)
+    if failed:
+        print(f"[batch] {failed} of {len(targets)} targets failed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,89 @@
+"""! @brief Spots blank cells in a spritesheet, and applies the blank cell policy."""
+
+##
+# @file blank.py
+#
+# @brief Spots blank cells in a spritesheet, and applies the blank cell policy.
+#
+# @section description_blank Description
+# A cell is blank if it's fully transparent, or filled with a single flat color.
+# The check only uses getbbox() on the alpha band and getextrema(), so it runs in
+# Pillow before the cell gets quantized or encoded.
+#
+# Policies:
+# - keep: blank cells are converted like any other cell.
+# - skip: blank cells are dropped.
+# - shared: blank cells are not converted: all the blank cells with the same color
+#   share one frame, filled with the nearest color of the other frames' palette.
+#   The nearest color is found with a lookup table from lut.py, for the chosen metric.
+#
+# @section libraries_main Libraries/Modules
+#
+# @section notes_blank Notes
+# - The color of a blank cell is the rgb color of its first pixel.
+#
+# @section todo_blank TODO
+#
+# @section author_blank Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+from .animation import Frame
+from .lut import palette_lut
+
+BLANK_POLICIES = ("keep", "skip", "shared")
+
+def is_blank_cell(cell):
+    """! Checks if a cell is fully transparent, or a single flat color."""
+    bands = cell.getbands()
+    if 'A' in bands and cell.getchannel('A').getbbox() is None:
+        return True
+    extrema = cell.getextrema()
+    if len(bands) == 1:
+        extrema = (extrema,)
+    return all(low == high for low, high in extrema)
+
+def blank_key(cell):
+    """! Returns the rgb color a blank cell is shared by."""
+    return cell.getpixel((0, 0)) if cell.mode == 'RGB' else cell.convert('RGB').getpixel((0, 0))
+
+def blank_frame(cell, palette, metric="euclidean"):
+    """! Builds the frame for a blank cell, filled with the nearest color in palette.
+    @param metric   The color distance, one of lut.METRICS.
+    """
+    idx = palette_lut(palette, metric).nearest(blank_key(cell))
+    (width, height) = cell.size
+    return Frame(bytes((idx,)) * (width * height), width, height, palette)
+
+def convert_cells(cells, convert, blank="keep", metric="euclidean"):
+    """! Converts the cells of a spritesheet to frames, applying the blank cell policy.
+    @param cells   The sprite cells, in sheet order.
+    @param convert   Converts a cell to a Frame.
+    @param blank   One of BLANK_POLICIES.
+    @param metric   The color distance for shared blank cells, one of lut.METRICS.
+    @return  A tuple of: frames, sources (the sprite number of each frame).
+    """
+    frames = []
+    sources = []
+    blanks = {}
+    for idx, cell in enumerate(cells):
+        if blank != "keep" and is_blank_cell(cell):
+            if blank == "skip":
+                continue
+            # Filled once all the other frames are converted, to use their palette
+            blanks.setdefault(blank_key(cell), (cell, []))[1].append(len(frames))
+            frames.append(None)
+        else:
+            frames.append(convert(cell))
+        sources.append(f"sprite #{idx}")
+
+    reference = next((frame for frame in frames if frame is not None), None)
+    for cell, positions in blanks.values():
+        if reference is None:
+            shared = convert(cell)
+            reference = shared
+        else:
+            shared = blank_frame(cell, reference.palette, metric)
+        for pos in positions:
+            frames[pos] = shared
+    return (frames, sources)
@@ -36,7 +36,7 @@
 #
 # @section author_cut_spritesheet Author(s)
 # - Created by jgabaut on 17/04/2023.
-# - Modified by jgabaut on 31/01/2025.
+# - Modified by jgabaut on 19/10/2026.
 
 # Imports
 import sys
@@ -44,9 +44,20 @@ import os
 from PIL import Image
 from .utils import log_wrong_argnum
 from .utils import intparse_args
+from .utils import pop_flag
+from .utils import pop_option
 from .utils import SheetArgs
+from .bands import iter_bands
+from .bands import band_cells
+from .bands import sheet_grid
+from .bands import row_cells
+from .grid import auto_grid_args
+from .atlas import atlas_entry
+from .blank import BLANK_POLICIES
+from .blank import is_blank_cell
+from .blank import blank_key
 
-SCRIPT_VERSION="0.1.0"
+SCRIPT_VERSION="0.1.1"
 
 F_ARG_OUTD = "<output_directory>"
 F_ARG_SW = "<sprite_width>"
@@ -58,31 +69,193 @@ EXPECTED_ARGS = 7
 def usage():
     """! Prints correct invocation."""
     print("Wrong arguments.")
-    print(f"\nUsage:\tpython {os.path.basename(__file__)} {F_STRING_ARGS}")
+    print(f"\nUsage:\tpython {os.path.basename(__file__)} [--stream] [--auto-grid]\
+ [--blank <policy>] {F_STRING_ARGS}")
+    print(f"\tpython {os.path.basename(__file__)} [--stream] [--blank <policy>]\
+ --atlas <atlas.json> <animation> {F_ARG_OUTD}")
+    print("\n    --stream:\tdecode the sheet one row of sprites at a time, to save memory")
+    print("    --auto-grid:\tdetect sprite size, separator and start from the sheet,")
+    print("\t\tinstead of passing them")
+    print(f"    --blank:\twhat to do with empty or flat cells: {', '.join(BLANK_POLICIES)}")
 
 
-def cut_spritesheet(filename, output_dir, s: SheetArgs):
+class SpriteSaver:
+    """! Saves the sprites cut from a sheet, applying the blank cell policy."""
+
+    def __init__(self, output_dir, blank="keep"):
+        """! Builds a saver.
+        @param output_dir  The directory where output images will be saved.
+        @param blank   The blank cell policy, one of BLANK_POLICIES.
+        """
+        self.output_dir = output_dir
+        self.blank = blank
+        self.blanks = 0
+        ## The shared blank files already saved, by color.
+        self.saved_blanks = {}
+
+    def save(self, sprite, source, number):
+        """! Saves a sprite as image<number>.png, unless it's blank and not kept.
+        @param sprite   The sprite to save.
+        @param source   The cell the sprite was cut from, before quantization.
+                        Unused when keeping blank cells.
+        @param number   The sprite number.
+        """
+        if self.blank == "keep" or not is_blank_cell(source):
+            sprite.save(os.path.join(self.output_dir, f"image{number}.png"))
+            return
+        self.blanks += 1
+        if self.blank == "shared":
+            key = blank_key(source)
+            if key not in self.saved_blanks:
+                self.saved_blanks[key] = os.path.join(self.output_dir,
+                                                      f"blank{len(self.saved_blanks) + 1}.png")
+                sprite.save(self.saved_blanks[key])
+
+    def log_blanks(self):
+        """! Prints how many blank cells were found, if not keeping them."""
+        if self.blank == "skip":
+            print(f"Skipped {self.blanks} blank cells.")
+        elif self.blank == "shared":
+            print(f"Saved {self.blanks} blank cells as {len(self.saved_blanks)} shared files.")
+
+def has_alpha(img):
+    """! Checks if an opened sheet has an alpha band, or a transparent color."""
+    return 'A' in img.getbands() or 'transparency' in img.info
+
+def sheet_palette(filename, s: SheetArgs, alpha=False):
+    """! Collects the colors used in the rows of sprites of a spritesheet, one band at a time.
+    @param filename   The input spritesheet file.
+    @param alpha   If True, colors are collected as RGBA, and the palette keeps their alpha.
+    @return  A 'P' image holding the palette, or None if there are more than 256 colors.
+    """
+    with Image.open(filename) as img:
+        columns = sheet_grid(img.size, s)[1]
+    # Only the cells matter: an atlas band also crosses other animations
+    right = s.start_x + columns * (s.sprite_width + s.sep_size)
+    rawmode = 'RGBA' if alpha else 'RGB'
+    colors = {}
+    for _, band in iter_bands(filename, s):
+        band = band.crop((s.start_x, 0, right, s.sprite_height))
+        band_colors = band.convert(rawmode).getcolors(256)
+        if band_colors is None:
+            return None
+        for _, color in band_colors:
+            colors.setdefault(color, len(colors))
+        if len(colors) > 256:
+            return None
+    palette_img = Image.new('P', (1, 1))
+    palette_img.putpalette([channel for color in colors for channel in color], rawmode)
+    return palette_img
+
+def band_mapper(palette_img):
+    """! Returns the function mapping a band to the colors of a palette from sheet_palette().
+    Pillow only quantizes RGB images to a given palette: RGBA bands are mapped here,
+    looking up each pixel in the palette, since it holds all the colors of the sheet.
+    """
+    if palette_img.palette.mode != 'RGBA':
+        return lambda band: band.convert('RGB').quantize(palette=palette_img,
+                                                         dither=Image.Dither.NONE)
+    colors = palette_img.getpalette('RGBA')
+    index = {int.from_bytes(bytes(colors[i:i + 4]), sys.byteorder): i // 4
+             for i in range(0, len(colors), 4)}
+
+    def map_band(band):
+        pixels = memoryview(band.convert('RGBA').tobytes()).cast('I')
+        mapped = Image.frombytes('P', band.size, bytes(map(index.__getitem__, pixels)))
+        mapped.putpalette(colors, 'RGBA')
+        return mapped
+    return map_band
+
+def sheet_mapper(filename, s: SheetArgs, opaque=False):
+    """! Returns the function mapping the bands of a sheet to the palette of its sprites.
+    Indexed sheets keep their own palette.
+    @return  The mapping function, or None if the sheet uses more than 256 colors.
+    """
+    with Image.open(filename) as img:
+        if img.mode == 'P':
+            return lambda band: band
+        alpha = has_alpha(img) and not opaque
+    palette_img = sheet_palette(filename, s, alpha)
+    return band_mapper(palette_img) if palette_img is not None else None
+
+def cut_spritesheet_bands(filename, output_dir, s: SheetArgs, blank="keep", opaque=False):
+    """! Converts a spritesheet to a set of individual sprite images, one row of sprites at a time.
+    Indexed sheets keep their own palette. Other sheets are mapped to the colors they use,
+    which are collected in a first pass, so all the sprites still share the same palette.
+    Sheets with alpha keep it in the palette, so the sprites get the same transparency.
+    @param filename   The input spritesheet file.
+    @param output_dir  The directory where output images will be saved.
+    @param blank   The blank cell policy, one of BLANK_POLICIES.
+    @param opaque   If True, the alpha band of the sheet is dropped, as the cells don't use it.
+    @return  False if the sheet could not be mapped to a single 256 colors palette.
+    """
+    with Image.open(filename) as img:
+        (_, columns) = sheet_grid(img.size, s)
+    map_band = sheet_mapper(filename, s, opaque)
+    if map_band is None:
+        print(f"[ERROR] {filename} uses more than 256 colors, can't cut it with --stream.")
+        return False
+
+    saver = SpriteSaver(output_dir, blank)
+    for i, band in iter_bands(filename, s):
+        sources = band_cells(band, row_cells(i, columns, s), s)
+        band = map_band(band)
+        for j, (sprite, source) in enumerate(zip(band_cells(band, row_cells(i, columns, s), s),
+                                                 sources)):
+            saver.save(sprite, source, i * columns + j + 1)
+        del band
+    saver.log_blanks()
+    return True
+
+def cut_spritesheet(filename, output_dir, s: SheetArgs, stream=False, **opts):
     """! Converts a spritesheet to a set of individual sprite images.
     @param filename   The input spritesheet file.
     @param output_dir  The directory where output images will be saved.
+    @param stream   If True, decode the sheet one row of sprites at a time.
+    @param opts   The blank cell policy, one of BLANK_POLICIES (blank, default keep);
+                  whether to drop the alpha band the cells don't use (opaque, default False).
     """
-    img = Image.open(filename)
-    sprites_per_row = (img.size[0] - s.start_x + s.sep_size) // (s.sprite_width + s.sep_size)
-    sprites_per_column = (img.size[1] - s.start_y + s.sep_size) // (s.sprite_height + s.sep_size)
+    if stream:
+        return cut_spritesheet_bands(filename, output_dir, s, **opts)
+    source_img = Image.open(filename)
+    if opts.get("opaque", False):
+        source_img = source_img.convert('RGB')
+    (sprites_per_column, sprites_per_row) = sheet_grid(source_img.size, s)
 
-    img = img.convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
+    img = source_img.convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
+    saver = SpriteSaver(output_dir, opts.get("blank", "keep"))
 
     #sprite_index = 1
-    for i in range(sprites_per_row):
-        for j in range(sprites_per_column):
+    for i in range(sprites_per_column):
+        for j in range(row_cells(i, sprites_per_row, s)):
             spr_x = s.start_x + j * (s.sprite_width + s.sep_size)
             spr_y = s.start_y + i * (s.sprite_height + s.sep_size)
-            sprite = img.crop((spr_x, spr_y, spr_x + s.sprite_width, spr_y + s.sprite_height))
-            output_file = os.path.join(output_dir, f"image{i * sprites_per_column + j + 1}.png")
-            sprite.save(output_file)
+            box = (spr_x, spr_y, spr_x + s.sprite_width, spr_y + s.sprite_height)
+            # The source cell is only needed to spot blank cells
+            saver.save(img.crop(box), source_img.crop(box) if saver.blank != "keep" else None,
+                       i * sprites_per_row + j + 1)
+    saver.log_blanks()
+    return True
 
 def main(argv):
     """! Main program entry."""
+    stream, argv = pop_flag(argv, "--stream")
+    auto_grid, argv = pop_flag(argv, "--auto-grid")
+    (blank, argv) = pop_option(argv, "--blank")
+    if blank is not None and blank not in BLANK_POLICIES:
+        print(f"Unexpected --blank value: {blank}")
+        usage()
+        sys.exit(1)
+    (atlas_index, argv) = pop_option(argv, "--atlas")
+    if atlas_index is not None and len(argv) - 1 == EXPECTED_ARGS - 5:
+        entry = atlas_entry(atlas_index, argv[1])
+        if entry is None:
+            sys.exit(1)
+        cut_spritesheet(entry[0], argv[2], entry[1], stream, blank=blank or "keep",
+                        opaque=not entry[2])
+        return
+    if auto_grid and len(argv) - 1 == EXPECTED_ARGS - 5:
+        argv = argv + auto_grid_args(argv[1], sys.stdout)
     if (len(argv)-1) != EXPECTED_ARGS:
         if (len(argv) == 2 and argv[1] in ('version', '-v', '--version')):
             print(f"cut_sheet v{SCRIPT_VERSION}")
@@ -94,7 +267,8 @@ def main(argv):
         file = argv[1]
         outdir = argv[2]
         ints = intparse_args(argv[3], argv[4], argv[5], argv[6], argv[7])
-        cut_spritesheet(file,outdir,SheetArgs(ints[0],ints[1],ints[2],ints[3],ints[4]))
+        cut_spritesheet(file,outdir,SheetArgs(ints[0],ints[1],ints[2],ints[3],ints[4]),stream,
+                        blank=blank or "keep")
 
 if __name__ == "__main__":
     main(sys.argv)
@@ -0,0 +1,156 @@
+"""! @brief Detects the sprite grid of a spritesheet from its separator lines."""
+
+##
+# @file grid.py
+#
+# @brief Detects the sprite grid of a spritesheet from its separator lines.
+#
+# @section description_grid Description
+# The sheet is quantized like cut_sheet does, then each row and column is projected to
+# a single value: its palette index if all its pixels share it, else nothing.
+# Row checks compare each scanline of the index plane against a repeated byte, columns
+# do the same on the transposed plane, so each pixel is only looked at by Pillow or by
+# bytes comparisons.
+#
+# The separator color is the one filling the most whole rows and columns. Runs of
+# separator lines then give the first sprite corner (the leading run), the separator
+# size (the most common inner run) and the sprite size (the most common run between
+# separators). The result is checked against every separator band before being used.
+#
+# @section libraries_main Libraries/Modules
+# - Pillow (https://pillow.readthedocs.io/en/stable/)
+#   - Access to image manipulation functions.
+# - collections standard library (https://docs.python.org/3/library/collections.html)
+#   - Access to Counter.
+#
+# @section notes_grid Notes
+# - Sheets without separator lines can't be detected.
+#
+# @section todo_grid TODO
+#
+# @section author_grid Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import sys
+import itertools
+from collections import Counter
+from PIL import Image
+from .utils import SheetArgs
+
+def uniform_lines(plane, width, height):
+    """! Returns, for each row of an index plane, its index if the row is uniform, else None."""
+    lines = []
+    for y in range(height):
+        row = plane[y * width:(y + 1) * width]
+        lines.append(row[0] if row == row[:1] * width else None)
+    return lines
+
+def line_runs(is_sep):
+    """! Returns the runs of a bool list as (is separator, start, length) tuples."""
+    runs = []
+    start = 0
+    for value, group in itertools.groupby(is_sep):
+        length = len(list(group))
+        runs.append((value, start, length))
+        start += length
+    return runs
+
+def most_common(values):
+    """! Returns the most common value, the largest one on ties, or None if empty."""
+    counts = Counter(values)
+    if not counts:
+        return None
+    return max(counts, key=lambda value: (counts[value], value))
+
+def axis_grid(is_sep):
+    """! Finds (start, cell size, separator size) along one axis, or None.
+    @param is_sep   For each line, True if it's a separator line.
+    """
+    runs = line_runs(is_sep)
+    content = [length for value, _, length in runs if not value]
+    if not content:
+        return None
+    start = runs[0][2] if runs[0][0] else 0
+    inner = [length for idx, (value, _, length) in enumerate(runs)
+             if value and 0 < idx < len(runs) - 1]
+    cell = most_common(content)
+    sep = most_common(inner) or 0
+    return (start, cell, sep)
+
+def grid_fits(is_sep, start, cell, sep):
+    """! Checks that every separator band between cells holds only separator lines."""
+    if cell <= 0:
+        return False
+    count = (len(is_sep) - start + sep) // (cell + sep)
+    for k in range(count - 1):
+        band = start + k * (cell + sep) + cell
+        if not all(is_sep[band:band + sep]):
+            return False
+    return count > 0
+
+def separator_index(rows, columns):
+    """! Returns the palette index filling the most uniform rows and columns, or None.
+    The separator color must fill both whole rows and whole columns.
+    """
+    row_colors = Counter(idx for idx in rows if idx is not None)
+    column_colors = Counter(idx for idx in columns if idx is not None)
+    shared = [idx for idx in row_colors if idx in column_colors]
+    if not shared:
+        return None
+    return max(shared, key=lambda idx: (row_colors[idx] + column_colors[idx], -idx))
+
+def detect_grid(img):
+    """! Detects the sprite grid of a spritesheet.
+    @param img   The opened spritesheet.
+    @return  A tuple of: SheetArgs, separator rgb color. None if no grid was found.
+    """
+    if img.mode != 'P':
+        img = img.convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
+    width, height = img.size
+    rows = uniform_lines(img.tobytes(), width, height)
+    columns = uniform_lines(img.transpose(Image.Transpose.TRANSPOSE).tobytes(), height, width)
+    sep_idx = separator_index(rows, columns)
+    if sep_idx is None:
+        return None
+
+    row_sep = [idx == sep_idx for idx in rows]
+    column_sep = [idx == sep_idx for idx in columns]
+    y_grid = axis_grid(row_sep)
+    x_grid = axis_grid(column_sep)
+    if y_grid is None or x_grid is None:
+        return None
+    # SheetArgs has one separator size: an axis with a single cell has no inner separator
+    sep = max(y_grid[2], x_grid[2])
+    if 0 not in (y_grid[2], x_grid[2]) and y_grid[2] != x_grid[2]:
+        return None
+    if not (grid_fits(row_sep, y_grid[0], y_grid[1], sep)
+            and grid_fits(column_sep, x_grid[0], x_grid[1], sep)):
+        return None
+    palette = img.getpalette()
+    sep_color = tuple(palette[sep_idx * 3:sep_idx * 3 + 3])
+    return (SheetArgs(x_grid[1], y_grid[1], sep, x_grid[0], y_grid[0]), sep_color)
+
+def log_detected_grid(filename, detected, out):
+    """! Logs the detected grid, or the failure, to out."""
+    if detected is None:
+        print(f"[ERROR] Could not detect a sprite grid in {filename}.", file=out)
+        print("Pass sprite_width sprite_height sep_size start_x start_y instead.", file=out)
+        return
+    (s, sep_color) = detected
+    print(f"Detected grid for {filename}: {s} (separator color {sep_color})", file=out)
+    print(f"--> {s.sprite_width} {s.sprite_height} {s.sep_size} {s.start_x} {s.start_y}",
+          file=out)
+
+def auto_grid_args(filename, out):
+    """! Detects the grid of a spritesheet, returning it as the five geometry arguments.
+    Logs the detected grid to out. Exits if no grid is found.
+    """
+    with Image.open(filename) as img:
+        detected = detect_grid(img)
+    log_detected_grid(filename, detected, out)
+    if detected is None:
+        sys.exit(1)
+    s = detected[0]
+    return [str(s.sprite_width), str(s.sprite_height), str(s.sep_size),
+            str(s.start_x), str(s.start_y)]
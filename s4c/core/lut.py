@@ -0,0 +1,105 @@
+"""! @brief Nearest-color lookups, memoized per palette."""
+
+##
+# @file lut.py
+#
+# @brief Nearest-color lookups, memoized per palette.
+#
+# @section description_lut Description
+# A lookup table maps an RGB color to the index of the nearest color in a palette, for a
+# metric. Each color is searched once, then its index is kept in a dict keyed by color.
+#
+# Tables live in the process only: the lookups are few (one per blank color with
+# --blank shared), so they are not worth sharing between processes or runs.
+# The last MAX_LUTS tables used are kept.
+#
+# Metrics:
+# - euclidean: distance in RGB space, as utils.color_distance(). Ties pick the first color.
+# - cielab: CIE76 distance in L*a*b* space, closer to perceived difference.
+#
+# @section libraries_main Libraries/Modules
+# - functools standard library (https://docs.python.org/3/library/functools.html)
+#   - Access to lru_cache.
+#
+# @section notes_lut Notes
+#
+# @section todo_lut TODO
+#
+# @section author_lut Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import functools
+
+METRICS = ("euclidean", "cielab")
+## Lookup tables kept by palette_lut(), least recently used first to go.
+MAX_LUTS = 8
+
+def _linear(channel):
+    """! Converts an sRGB channel to linear light."""
+    c = channel / 255
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+def _lab_f(t):
+    return t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116
+
+def rgb_to_lab(color):
+    """! Converts an (r,g,b) color to CIE L*a*b*, with D65 white."""
+    r, g, b = (_linear(channel) for channel in color)
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047
+    y = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883
+    fx, fy, fz = _lab_f(x), _lab_f(y), _lab_f(z)
+    return (116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+class NearestColorLUT:
+    """! Maps any RGB color to the index of the nearest color in a palette."""
+    __slots__ = ("palette", "metric", "_points", "_memo")
+
+    def __init__(self, palette, metric="euclidean"):
+        """! Builds an empty table for palette.
+        @param palette   The rgb palette, a sequence of (r,g,b).
+        @param metric   One of METRICS.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown color metric: {metric}, expected one of {METRICS}")
+        if not 0 < len(palette) <= 256:
+            raise ValueError(f"Unexpected palette size: {len(palette)}")
+        self.palette = tuple(tuple(color) for color in palette)
+        self.metric = metric
+        if metric == "cielab":
+            self._points = [rgb_to_lab(color) for color in self.palette]
+        else:
+            self._points = self.palette
+        self._memo = {}
+
+    def search(self, color):
+        """! Returns the index of the nearest palette color, without using the table."""
+        target = rgb_to_lab(color) if self.metric == "cielab" else color
+        best_idx = 0
+        best_dist = None
+        for idx, point in enumerate(self._points):
+            dist = ((point[0] - target[0]) ** 2
+                    + (point[1] - target[1]) ** 2
+                    + (point[2] - target[2]) ** 2)
+            if best_dist is None or dist < best_dist:
+                best_idx = idx
+                best_dist = dist
+        return best_idx
+
+    def nearest(self, color):
+        """! Returns the index of the nearest palette color for an (r,g,b) color."""
+        color = tuple(color[:3])
+        idx = self._memo.get(color)
+        if idx is None:
+            idx = self.search(color)
+            self._memo[color] = idx
+        return idx
+
+@functools.lru_cache(maxsize=MAX_LUTS)
+def _cached_lut(palette, metric):
+    return NearestColorLUT(palette, metric)
+
+def palette_lut(palette, metric="euclidean"):
+    """! Returns the lookup table for palette, shared by the lookups of this process."""
+    return _cached_lut(tuple(tuple(color) for color in palette), metric)
@@ -0,0 +1,307 @@
+#!/usr/bin/python3
+"""! @brief Program that checks the peak memory use of the converters against budgets."""
+
+##
+# @file memcheck.py
+#
+# @brief Program that checks the peak memory use of the converters against budgets.
+#
+# @section description_memcheck Description
+# Generates a spritesheet of n x n sprites, and a sprites directory with as many frames,
+# for each requested n. Then runs each converter stage on them in a fresh process, with
+# tracemalloc on and a thread sampling the process RSS.
+#
+# Each stage first runs once on a single sprite, so that imports and plugin loading are
+# done before measuring. For each stage it records the peak of traced Python allocations,
+# the RSS growth, and the top allocation sites, as seen in a snapshot taken when the traced
+# memory grew the most. Pillow image buffers are not traced by tracemalloc, the RSS growth
+# covers them.
+#
+# Budgets are a fixed allowance, plus bytes per input pixel, plus bytes per pixel of the
+# frames a stage keeps until it prints them:
+#
+#     budget = FIXED_BUDGET + per_pixel * pixels + kept * frame pixels
+#
+# The input pixels of the --stream stages are those of one band, sheet width times
+# (sprite height + separator): a stage decoding the whole sheet goes over its budget.
+# A stage over its traced or RSS budget fails the run, so memory savings are kept.
+#
+# @section libraries_main Libraries/Modules
+# - Pillow (https://pillow.readthedocs.io/en/stable/)
+#   - Access to image manipulation functions.
+# - tracemalloc standard library (https://docs.python.org/3/library/tracemalloc.html)
+#   - Access to traced allocations.
+# - concurrent.futures standard library (https://docs.python.org/3/library/concurrent.futures.html)
+#   - Access to ProcessPoolExecutor.
+# - threading standard library (https://docs.python.org/3/library/threading.html)
+#   - Access to the RSS sampling thread.
+#
+# @section notes_memcheck Notes
+# - RSS is read from /proc/self/statm: where it's missing, only traced memory is checked.
+#
+# @section todo_memcheck TODO
+#
+# @section author_memcheck Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+from PIL import Image
+from PIL import ImageChops
+from .utils import SheetArgs
+from .utils import pop_option
+from .sheet_converter import convert_spritesheet
+from .cut_sheet import cut_spritesheet
+from .sprites import print_converted_sprites
+from .png_resize import resize_sprites
+
+SCRIPT_VERSION = "0.1.0"
+F_STRING_ARGS = "[--sizes <n>[,<n>...]] [--stage <name>] [--top <n>] [--report <report.json>]"
+## Side of the generated sprites.
+CELL = 32
+## Separator between the generated sprites.
+SEP = 1
+## Sprites per sheet side, for each run.
+DEFAULT_SIZES = (16, 64)
+DEFAULT_TOP = 3
+SAMPLE_INTERVAL = 0.005
+## A new snapshot is taken when the traced memory grows by this factor.
+SNAPSHOT_GROWTH = 1.25
+FIXED_BUDGET = 8 * 1024 * 1024
+
+## Budgets in bytes per input pixel: (traced, rss, kept frames). About twice the measured peaks.
+BUDGETS = {
+    "convert_spritesheet": (1, 8, 1),
+    "convert_spritesheet --stream": (6, 12, 2),
+    "cut_spritesheet": (1, 16, 0),
+    "cut_spritesheet --stream": (4, 8, 0),
+    "print_converted_sprites": (1, 2, 1),
+    "resize_sprites": (1, 4, 0),
+}
+## Sprites per sheet side of the warm-up inputs.
+WARMUP_SIZE = 1
+
+class Inputs(NamedTuple):
+    """! The generated inputs for a size."""
+    sheet: str
+    geometry: SheetArgs
+    sprites: str
+    ## Pixels in the sheet.
+    sheet_pixels: int
+    ## Pixels in one band of the sheet: a row of sprites and its separator.
+    band_pixels: int
+    ## Pixels in all the frames: the sprites of the sheet, or the sprites directory.
+    frame_pixels: int
+
+    def pixels(self, name):
+        """! Returns the input pixels of a stage."""
+        if name.endswith("--stream"):
+            return self.band_pixels
+        return self.sheet_pixels if "spritesheet" in name else self.frame_pixels
+
+# Functions
+def usage():
+    """! Prints correct invocation."""
+    print("Wrong arguments.")
+    print(f"\nUsage:\tpython {os.path.basename(__file__)} {F_STRING_ARGS}")
+    print("\n  --sizes:\tsprites per sheet side, one run for each, default"
+          f" {','.join(str(n) for n in DEFAULT_SIZES)}")
+    print(f"  --stage:\tonly run one stage: {', '.join(BUDGETS)}")
+    print(f"  --top:\tallocation sites to list for each stage, default {DEFAULT_TOP}")
+    print("  --report:\twrite the results as JSON")
+    sys.exit(1)
+
+def sample_tile():
+    """! Returns the sprite the inputs are made of: 16 colors in an irregular pattern."""
+    colors = [((idx * 53) % 256, (idx * 101) % 256, (idx * 29) % 256) for idx in range(16)]
+    tile = Image.new('RGB', (CELL, CELL))
+    tile.putdata([colors[(x * 3 + y * 5 + (x * y) % 7) % 16]
+                  for y in range(CELL) for x in range(CELL)])
+    return tile
+
+def make_inputs(directory, size):
+    """! Writes the sheet and the sprites directory for a size.
+    Every sprite is the same tile, shifted: each has the same colors and the same palette.
+    @param directory   Where to write the inputs.
+    @param size   Sprites per sheet side. The sprites directory has size * size frames.
+    """
+    tile = sample_tile()
+    side = size * (CELL + SEP) - SEP
+    sheet = Image.new('RGB', (side, side), (255, 0, 255))
+    sprites = os.path.join(directory, f"sprites-{size}")
+    os.makedirs(sprites)
+    for idx in range(size * size):
+        sprite = ImageChops.offset(tile, idx % CELL, 0)
+        (row, col) = divmod(idx, size)
+        sheet.paste(sprite, (col * (CELL + SEP), row * (CELL + SEP)))
+        sprite.save(os.path.join(sprites, f"image{idx + 1}.png"))
+    sheet_path = os.path.join(directory, f"sheet-{size}.png")
+    sheet.save(sheet_path)
+    return Inputs(sheet_path, SheetArgs(CELL, CELL, SEP, 0, 0), sprites, side * side,
+                  side * (CELL + SEP), size * size * CELL * CELL)
+
+def stage_call(name, inputs, scratch):
+    """! Returns the call running a stage, after preparing its inputs in scratch."""
+    if name.startswith("convert_spritesheet"):
+        return functools.partial(convert_spritesheet, "cfile", inputs.sheet, inputs.geometry,
+                                 stream=name.endswith("--stream"))
+    if name.startswith("cut_spritesheet"):
+        return functools.partial(cut_spritesheet, inputs.sheet, scratch, inputs.geometry,
+                                 stream=name.endswith("--stream"))
+    if name == "print_converted_sprites":
+        return functools.partial(print_converted_sprites, "cfile", inputs.sprites)
+    # resize_sprites works in place
+    directory = shutil.copytree(inputs.sprites, os.path.join(scratch, "sprites"))
+    return functools.partial(resize_sprites, directory, CELL // 2, CELL // 2)
+
+def current_rss():
+    """! Returns the resident memory of the process in bytes, or None if unknown."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm_fp:
+            return int(statm_fp.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+class Sampler(threading.Thread):
+    """! Samples the RSS, and snapshots the traced allocations as they grow."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.done = threading.Event()
+        self.peak_rss = current_rss()
+        self.snapshot = None
+        self.snapshot_size = 0
+
+    def run(self):
+        while not self.done.wait(SAMPLE_INTERVAL):
+            self.sample()
+        self.sample()
+
+    def sample(self):
+        """! Updates the RSS peak, and takes a snapshot if the traced memory grew enough."""
+        rss = current_rss()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss, rss)
+        traced = tracemalloc.get_traced_memory()[0]
+        if traced > self.snapshot_size * SNAPSHOT_GROWTH:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = traced
+
+def top_sites(snapshot, top):
+    """! Returns the top allocation sites of a snapshot, as (file:line, bytes) tuples."""
+    if snapshot is None:
+        return []
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, threading.__file__),
+                                       tracemalloc.Filter(False, __file__)))
+    return [(f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", stat.size)
+            for stat in snapshot.statistics("lineno")[:top]]
+
+def run_stage(name, inputs, warmup, top):
+    """! Runs a stage, measuring its memory use. Runs in a fresh worker process.
+    @param warmup   The inputs of a first, unmeasured run.
+    @return  A dict of: traced peak, rss growth (None if unknown), seconds, top sites.
+    """
+    with tempfile.TemporaryDirectory() as scratch, open(os.devnull, "w",
+                                                         encoding="utf-8") as null_fp:
+        os.makedirs(os.path.join(scratch, "warmup"))
+        with contextlib.redirect_stdout(null_fp):
+            stage_call(name, warmup, os.path.join(scratch, "warmup"))()
+        call = stage_call(name, inputs, scratch)
+        sampler = Sampler()
+        rss_start = sampler.peak_rss
+        tracemalloc.start()
+        sampler.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(null_fp):
+            call()
+        elapsed = time.perf_counter() - start
+        sampler.done.set()
+        sampler.join()
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"traced": traced_peak,
+            "rss": sampler.peak_rss - rss_start if rss_start is not None else None,
+            "seconds": round(elapsed, 3), "sites": top_sites(sampler.snapshot, top)}
+
+def check_result(name, inputs, result):
+    """! Adds the budgets to a stage result, and checks them.
+    @return  True if the stage is within its budgets.
+    """
+    (traced_per_pixel, rss_per_pixel, kept) = BUDGETS[name]
+    frames = kept * inputs.frame_pixels
+    result["traced_budget"] = FIXED_BUDGET + traced_per_pixel * inputs.pixels(name) + frames
+    result["rss_budget"] = FIXED_BUDGET + rss_per_pixel * inputs.pixels(name) + frames
+    return (result["traced"] <= result["traced_budget"]
+            and (result["rss"] is None or result["rss"] <= result["rss_budget"]))
+
+def mib(size):
+    """! Formats a byte count in MiB."""
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+def log_result(name, size, result, passed):
+    """! Logs a stage result and its top allocation sites."""
+    rss = "rss unknown" if result["rss"] is None else\
+        f"rss +{mib(result['rss'])} (budget {mib(result['rss_budget'])})"
+    print(f"[mem] {name} ({size}x{size} sprites): traced peak {mib(result['traced'])}"
+          f" (budget {mib(result['traced_budget'])}), {rss}, {result['seconds']}s"
+          f" {'ok' if passed else 'OVER BUDGET'}")
+    for site, site_size in result["sites"]:
+        print(f"\t{mib(site_size)}\t{site}")
+
+def run_checks(sizes, stages, top):
+    """! Runs every stage on the inputs of each size.
+    @return  A tuple of: the results, the number of stages over budget.
+    """
+    results = []
+    failed = 0
+    spawn = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        warmup = make_inputs(os.path.join(directory, "warmup"), WARMUP_SIZE)
+        for size in sizes:
+            inputs = make_inputs(directory, size)
+            for name in stages:
+                # A new process for each stage, so the RSS of a stage doesn't hide the next
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    result = pool.submit(run_stage, name, inputs, warmup, top).result()
+                passed = check_result(name, inputs, result)
+                failed += not passed
+                log_result(name, size, result, passed)
+                results.append({"stage": name, "size": size, "pixels": inputs.pixels(name),
+                                "passed": passed, **result})
+    return (results, failed)
+
+def main(argv):
+    """! Main program entry."""
+    if len(argv) == 2 and argv[1] in ('version', '-v', '--version'):
+        print(f"memcheck v{SCRIPT_VERSION}")
+        sys.exit(0)
+    (sizes, argv) = pop_option(argv, "--sizes")
+    (stage, argv) = pop_option(argv, "--stage")
+    (top, argv) = pop_option(argv, "--top")
+    (report_path, argv) = pop_option(argv, "--report")
+    if len(argv) != 1 or (stage is not None and stage not in BUDGETS):
+        usage()
+    sizes = [int(n) for n in sizes.split(",")] if sizes is not None else DEFAULT_SIZES
+    (results, failed) = run_checks(sizes, [stage] if stage is not None else list(BUDGETS),
+                                   int(top) if top is not None else DEFAULT_TOP)
+    if report_path is not None:
+        with open(report_path, "w", encoding="utf-8") as report_fp:
+            json.dump(results, report_fp, indent=2)
+    if failed:
+        print(f"[mem] {failed} of {len(results)} stages over budget")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""! @brief Program that stitches the partial outputs of sharded conversions."""
+
+##
+# @file merge.py
+#
+# @brief Program that stitches the partial outputs of sharded conversions.
+#
+# @section description_merge Description
+# Takes the frames partials written by sprites --shard i/N, one for each shard, and prints
+# the output for the whole target in the requested mode. The frames are checked like
+# sprites does, and the output is the same as a sprites run on the whole target.
+#
+# With --config, reads the shared palettes partials written by batch --shard i/N for each
+# shard, then writes the shared palettes files of the config.
+#
+# @section libraries_main Libraries/Modules
+# - sys standard library (https://docs.python.org/3/library/sys.html)
+#   - Access to command line arguments.
+# - os standard library (https://docs.python.org/3/library/os.html)
+#   - Access to program name.
+#
+# @section notes_merge Notes
+# - Pass the same --resize options to every shard.
+#
+# @section todo_merge TODO
+#
+# @section author_merge Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import os
+import sys
+from .utils import convert_mode_lit
+from .utils import MODES
+from .utils import print_animation
+from .utils import pop_option
+from .sprites import FILE_VERSION
+from .validate import validated_animation
+from .shard import merge_frames
+from .batch import merged_palettes_target
+
+SCRIPT_VERSION = "0.1.0"
+F_STRING_ARGS = "[--report <report.json>] [--s4c_path <s4c_path>] <mode> <partial.json> [...]"
+F_STRING_CONFIG_ARGS = "--config <config.json>"
+EXPECTED_ARGS = 2
+
+# Functions
+def usage():
+    """! Prints correct invocation."""
+    print("Wrong arguments. Needed: mode, the partial of each shard; or a config file.")
+    print(f"\nUsage:\tpython {os.path.basename(__file__)} {F_STRING_ARGS}")
+    print(f"\tpython {os.path.basename(__file__)} {F_STRING_CONFIG_ARGS}")
+    print("\n  --config:\twrite the shared palettes of a config, from the batch shards")
+    sys.exit(1)
+
+def merge_sprites(mode, paths, s4c_path=("NONE",), report_path=None):
+    """! Prints the output for the target whose frames are in the partials.
+    @param mode   The output mode.
+    @param paths   The frames partial of each shard.
+    @param s4c_path   The path to sprites4curses dir (for includes).
+    @param report_path   If set, the frame validation report is written there as JSON.
+    @return  False if the partials are incomplete, or the frames don't match.
+    """
+    if mode not in MODES:
+        print(f"Unexpected mode value in merge_sprites(): {mode}")
+        usage()
+    merged = merge_frames(paths)
+    if merged is None:
+        return False
+    (target_name, frames, sources) = merged
+    animation = validated_animation(frames, sources, report_path)
+    if animation is None:
+        return False
+    print_animation(mode, target_name, FILE_VERSION, animation, s4c_path)
+    return True
+
+def main(argv):
+    """! Main program entry."""
+    if len(argv) == 2 and argv[1] in ('version', '-v', '--version'):
+        print(f"merge v{SCRIPT_VERSION}")
+        sys.exit(0)
+    (config_path, argv) = pop_option(argv, "--config")
+    if config_path is not None:
+        if len(argv) != 1:
+            usage()
+        sys.exit(0 if merged_palettes_target(config_path).build() else 1)
+    (report_path, argv) = pop_option(argv, "--report")
+    (s4c_path, argv) = pop_option(argv, "--s4c_path")
+    if len(argv) - 1 < EXPECTED_ARGS:
+        print(f"Wrong number of arguments. Expected at least {EXPECTED_ARGS}, got {len(argv)-1}.")
+        print(f"--> {argv[1:]}\n")
+        usage()
+    if not merge_sprites(convert_mode_lit(argv[1]), argv[2:], s4c_path or ("NONE",),
+                         report_path):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
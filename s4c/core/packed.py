@@ -0,0 +1,98 @@
+"""! @brief Packs palette indexes at 1, 2, 4 or 8 bits per pixel, and unpacks them back."""
+
+##
+# @file packed.py
+#
+# @brief Packs palette indexes at 1, 2, 4 or 8 bits per pixel, and unpacks them back.
+#
+# @section description_packed Description
+# The bits per pixel are the fewest of 1, 2, 4, 8 that can hold every palette index.
+# Each row starts on a new byte, pixels are packed from the most significant bits,
+# and the last byte of a row is padded with zero bits:
+#
+#     2 bpp, indexes 1 3 0 2 1  -->  0b01110010 0b01000000
+#
+# The unpacker reads back the C-header-packed and C-impl-packed outputs, so that the
+# generated files can be checked against the converted frames.
+#
+# @section libraries_main Libraries/Modules
+# - re standard library (https://docs.python.org/3/library/re.html)
+#   - Access to the generated code parsing.
+#
+# @section notes_packed Notes
+# - Indexes must fit in a byte, as they do for 'P' mode images.
+#
+# @section todo_packed TODO
+#
+# @section author_packed Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import re
+
+## The supported bits per pixel.
+PACKED_BPP = (1, 2, 4, 8)
+
+def bits_per_pixel(num_colors):
+    """! Returns the fewest bits per pixel holding num_colors palette indexes."""
+    return next(bpp for bpp in PACKED_BPP if num_colors <= 1 << bpp)
+
+def row_bytes(width, bpp):
+    """! Returns the bytes taken by a packed row."""
+    return (width * bpp + 7) // 8
+
+def pack_rows(frame, bpp):
+    """! Yields the packed rows of a Frame, as bytes."""
+    if bpp == 8:
+        yield from (bytes(row) for row in frame.rows())
+        return
+    per_byte = 8 // bpp
+    for row in frame.rows():
+        row = bytes(row) + bytes(-len(row) % per_byte)
+        packed = bytearray()
+        for start in range(0, len(row), per_byte):
+            value = 0
+            for idx in row[start:start + per_byte]:
+                value = value << bpp | idx
+            packed.append(value)
+        yield bytes(packed)
+
+def unpack_rows(data, width, height, bpp):
+    """! Unpacks packed rows back to an index plane of width * height bytes."""
+    if bpp == 8:
+        return bytes(data)
+    mask = (1 << bpp) - 1
+    shifts = range(8 - bpp, -1, -bpp)
+    stride = row_bytes(width, bpp)
+    plane = bytearray()
+    for y in range(height):
+        row = bytearray()
+        for value in data[y * stride:(y + 1) * stride]:
+            row.extend((value >> shift) & mask for shift in shifts)
+        plane.extend(row[:width])
+    return bytes(plane)
+
+def header_macros(header_text):
+    """! Returns the integer macros of a generated header, by name without the target prefix."""
+    macros = {}
+    for match in re.finditer(r"^#define \w+?_(TOT_FRAMES|TOT_COLORS|FRAME_WIDTH|FRAME_HEIGHT|BPP)"
+                             r" (\d+)$", header_text, re.MULTILINE):
+        macros[match.group(1)] = int(match.group(2))
+    return macros
+
+def unpack_outputs(header_text, impl_text):
+    """! Reads back the C-header-packed and C-impl-packed outputs of a target.
+    @param header_text   The generated header.
+    @param impl_text   The generated C file.
+    @return  A tuple of: rgb palette, the index plane of each frame.
+    """
+    macros = header_macros(header_text)
+    (palette_text, _, frames_text) = impl_text.partition("};")
+    values = [int(value) for value in re.findall(r"\b\d+\b", palette_text.partition("{")[2])]
+    palette = list(zip(values[0::3], values[1::3], values[2::3]))
+    data = bytes(int(value, 16) for value in re.findall(r"0x([0-9a-f]{2})", frames_text))
+    frame_size = macros["FRAME_HEIGHT"] * row_bytes(macros["FRAME_WIDTH"], macros["BPP"])
+    frames = [unpack_rows(data[idx * frame_size:(idx + 1) * frame_size], macros["FRAME_WIDTH"],
+                          macros["FRAME_HEIGHT"], macros["BPP"])
+              for idx in range(macros["TOT_FRAMES"])]
+    return (palette, frames)
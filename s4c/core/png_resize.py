@@ -13,6 +13,17 @@
 #   the sprite width,
 #   the sprite heigth.
 #
+# Resampling methods:
+# - bicubic: the default, smooth but adds new colors.
+# - nearest: keeps the source colors, for pixel art.
+# - reduce: Image.reduce() for integer downscale factors, nearest with a warning otherwise.
+#   Reduce averages each factor x factor box: it keeps the source colors only if every box
+#   is of one color, as in an exact integer upscale of the target, else it adds new ones.
+#
+# Files already at the target size are skipped, unless --force is passed.
+# With --keep-palette, 'P' mode files stay indexed and are always resized with nearest,
+# so their palette is left as is.
+#
 # @section libraries_main Libraries/Moodules
 # - Pillow (https://pillow.readthedocs.io/en/stable/)
 #   - Access to image manipulation functions.
@@ -29,27 +40,110 @@
 #
 # @section author_spritesheet Author(s)
 # - Created by jgabaut on 24/02/2023.
-# - Modified by jgabaut on 19/01/2024.
+# - Modified by jgabaut on 19/10/2026.
 
 # Imports
+import functools
 import os
 import sys
 from PIL import Image
+from .utils import pop_flag
+from .utils import pop_option
 
-SCRIPT_VERSION = "0.1.0"
+SCRIPT_VERSION = "0.1.1"
 STRING_ARGS = "<sprites_directory> <sprite_width> <sprite_height>"
+STRING_OPTS = "[--resample <bicubic|nearest|reduce>] [--keep-palette] [--force]"
+RESAMPLE_METHODS = ("bicubic", "nearest", "reduce")
 
 # Functions
 def usage():
     """! Prints correct invocation."""
     print("Wrong arguments. Needed: directory, desired sprite width, desired sprite height.")
-    print(f"\nUsage:\tpython {os.path.basename(__file__)} {STRING_ARGS}")
+    print(f"\nUsage:\tpython {os.path.basename(__file__)} {STRING_OPTS} {STRING_ARGS}")
+    print("\n  --resample:\tbicubic (default), nearest, or reduce for integer downscales")
+    print("\t\t(reduce averages pixels, nearest is used for other factors)")
+    print("  --keep-palette:\tkeep 'P' mode files indexed, instead of converting to RGB")
+    print("  --force:\tresize files already at the target size too")
+
+def indexed_bbox(im):
+    """! Returns the bounding box of the non-black pixels of a 'P' image.
+    Same as getbbox() after converting to RGB, without converting the pixels.
+    """
+    palette = im.getpalette() or []
+    table = bytes(0 if palette[idx * 3:idx * 3 + 3] in ([0, 0, 0], []) else 255
+                  for idx in range(256))
+    return Image.frombytes('L', im.size, im.tobytes().translate(table)).getbbox()
+
+@functools.lru_cache(maxsize=None)
+def warn_reduce_fallback(src_size, size):
+    """! Warns once per size pair that reduce falls back to nearest."""
+    print(f"[WARNING] {src_size[0]}x{src_size[1]} is not an integer multiple of"
+          f" {size[0]}x{size[1]}, resizing with nearest instead of reduce.", file=sys.stderr)
+
+def resize_image(im, size, resample="bicubic", keep_palette=False):
+    """! Crops an image to its non-black pixels, then resizes it to size.
+    @param im   The image to resize.
+    @param size   The target (width, height).
+    @param resample   One of RESAMPLE_METHODS.
+    @param keep_palette   If True, 'P' images stay indexed.
+    @return  The resized image.
+    """
+    if keep_palette and im.mode == 'P':
+        # Nearest is the only resampling that keeps the palette
+        return im.crop(indexed_bbox(im)).resize(size, Image.Resampling.NEAREST)
 
-def resize_sprites(directory, target_size_x, target_size_y):
+    # Convert to RGB mode
+    im = im.convert('RGB')
+    # Crop the image to the bounding box of the non-black pixels
+    im = im.crop(im.getbbox())
+    if resample == "reduce":
+        (factor_x, rest_x) = divmod(im.size[0], size[0])
+        (factor_y, rest_y) = divmod(im.size[1], size[1])
+        if factor_x >= 1 and factor_y >= 1 and rest_x == 0 and rest_y == 0:
+            return im.reduce((factor_x, factor_y))
+        warn_reduce_fallback(im.size, size)
+        resample = "nearest"
+    if resample == "nearest":
+        return im.resize(size, Image.Resampling.NEAREST)
+    return im.resize(size, Image.Resampling.BICUBIC)
+
+def resized(im, size, resample="bicubic"):
+    """! Returns the image as resize_sprites() would save it, without touching any file.
+    Images already at size are returned as they are, since resize_sprites() skips them.
+    """
+    if im.size == size:
+        return im
+    return resize_image(im, size, resample)
+
+def resize_option(argv):
+    """! Removes the "--resize WxH" and "--resample <method>" options from the argument list.
+    Exits if the values can't be parsed.
+    @param argv   The argument list.
+    @return  A tuple of: the resizing function for images (None if no --resize), argument list.
+    """
+    (size, argv) = pop_option(argv, "--resize")
+    (resample, argv) = pop_option(argv, "--resample")
+    if resample is not None and resample not in RESAMPLE_METHODS:
+        print(f"Unexpected --resample value: {resample}, expected one of {RESAMPLE_METHODS}")
+        sys.exit(1)
+    if size is None:
+        return (None, argv)
+    try:
+        (width, height) = (int(n) for n in size.lower().split("x"))
+    except ValueError:
+        print(f"Unexpected --resize value: {size}, expected <width>x<height>")
+        sys.exit(1)
+    # A partial of a module function, so it can be passed to worker processes
+    return (functools.partial(resized, size=(width, height), resample=resample or "bicubic"),
+            argv)
+
+def resize_sprites(directory, target_size_x, target_size_y, force=False, **opts):
     """! Resizes all png files in the passed directory to the specified size.
     @param directory   The input directory with the pngs.
     @param target_size_x   The target width.
     @param target_size_y   The target height.
+    @param force   If True, files already at the target size are resized too.
+    @param opts   The resize_image() options: resample, keep_palette.
     """
     # Set the target size
     size = (target_size_x, target_size_y)
@@ -57,21 +151,23 @@ def resize_sprites(directory, target_size_x, target_size_y):
     # Loop through all PNG files in the current directory
     for filename in os.listdir(directory):
         if filename.endswith('.png'):
-            # Open the file
+            # Open the file, only the header is read until the pixels are needed
             with Image.open(os.path.join(directory, filename)) as im:
-                # Convert to RGB mode
-                im = im.convert('RGB')
-                # Get the bounding box of the non-transparent pixels
-                bbox = im.getbbox()
-                # Crop the image to the bounding box
-                im = im.crop(bbox)
-                # Resize the image to the target size
-                im = im.resize(size, Image.Resampling.BICUBIC)
+                if im.size == size and not force:
+                    continue
+                im = resize_image(im, size, **opts)
                 # Save the image with the same filename
                 im.save(os.path.join(directory, filename))
 
 def main(argv):
     """! Main program entry."""
+    (resample, argv) = pop_option(argv, "--resample")
+    (keep_palette, argv) = pop_flag(argv, "--keep-palette")
+    (force, argv) = pop_flag(argv, "--force")
+    if resample is not None and resample not in RESAMPLE_METHODS:
+        print(f"Unexpected --resample value: {resample}")
+        usage()
+        sys.exit(1)
     if (len(argv)-1) != 3:
         if (len(argv) == 2 and argv[1] in ('version', '-v', '--version')):
             print(f"png_resize v{SCRIPT_VERSION}")
@@ -83,7 +179,8 @@ def main(argv):
         direc = argv[1]
         sprite_w = int(argv[2])
         sprite_h = int(argv[3])
-        resize_sprites(direc,sprite_w, sprite_h)
+        resize_sprites(direc,sprite_w, sprite_h, force,
+                       resample=resample or "bicubic", keep_palette=keep_palette)
 
 
 if __name__ == "__main__":
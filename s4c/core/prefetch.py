@@ -0,0 +1,103 @@
+"""! @brief Reads files ahead with a thread pool, to overlap I/O with conversion."""
+
+##
+# @file prefetch.py
+#
+# @brief Reads files ahead with a thread pool, to overlap I/O with conversion.
+#
+# @section description_prefetch Description
+# Up to depth files are read into memory by worker threads while the caller converts the
+# ones already read. Reads are queued in order, so files are handed out in the same order
+# they were passed. With slow storage (network mounts, cold caches) the latency of each
+# read then overlaps with the conversion of the previous frames.
+#
+# IOStats keeps the time spent reading (summed over the threads), the time the caller was
+# blocked waiting for a read, and the time spent converting, as measured by the caller.
+#
+# @section libraries_main Libraries/Modules
+# - concurrent.futures standard library (https://docs.python.org/3/library/concurrent.futures.html)
+#   - Access to ThreadPoolExecutor.
+# - time standard library (https://docs.python.org/3/library/time.html)
+#   - Access to perf_counter.
+#
+# @section notes_prefetch Notes
+# - Reading releases the GIL, so threads are enough to keep several reads in flight.
+#
+# @section todo_prefetch TODO
+#
+# @section author_prefetch Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import collections
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+## Upper bound for reader threads, whatever the depth.
+MAX_READERS = 16
+
+class IOStats:
+    """! Time spent on reads and conversion."""
+    __slots__ = ("files", "bytes", "read", "blocked", "encode")
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        ## Time spent reading, summed over the reader threads.
+        self.read = 0.0
+        ## Time the caller waited for a file to be read.
+        self.blocked = 0.0
+        ## Time the caller spent converting, measured by the caller.
+        self.encode = 0.0
+
+    def add_read(self, data, elapsed):
+        """! Counts a file read, of elapsed seconds."""
+        self.files += 1
+        self.bytes += len(data)
+        self.read += elapsed
+
+    def print(self, out=sys.stderr):
+        """! Prints the stats, to stderr by default since stdout holds the output."""
+        print(f"[io] {self.files} files, {self.bytes / 1024:.1f} KiB:"
+              f" reading {self.read:.3f}s, blocked on I/O {self.blocked:.3f}s,"
+              f" encoding {self.encode:.3f}s", file=out)
+
+def read_file(path):
+    """! Returns the content of path, and the time taken to read it."""
+    start = time.perf_counter()
+    with open(path, "rb") as file_fp:
+        data = file_fp.read()
+    return (data, time.perf_counter() - start)
+
+def prefetch(files, depth, stats):
+    """! Yields (file, content) for each file in order, reading up to depth files ahead.
+    @param files   The files to read.
+    @param depth   How many reads can be in flight. 0 reads each file when it's needed.
+    @param stats   The IOStats to update.
+    """
+    if depth <= 0:
+        for file in files:
+            (data, elapsed) = read_file(file)
+            stats.add_read(data, elapsed)
+            stats.blocked += elapsed
+            yield (file, data)
+        return
+    with ThreadPoolExecutor(max_workers=min(depth, MAX_READERS)) as pool:
+        pending = collections.deque()
+        queued = iter(files)
+        for file in queued:
+            pending.append((file, pool.submit(read_file, file)))
+            if len(pending) >= depth:
+                break
+        while pending:
+            (file, future) = pending.popleft()
+            start = time.perf_counter()
+            (data, elapsed) = future.result()
+            stats.blocked += time.perf_counter() - start
+            # Keep the queue full before handing out the file
+            for next_file in queued:
+                pending.append((next_file, pool.submit(read_file, next_file)))
+                break
+            stats.add_read(data, elapsed)
+            yield (file, data)
@@ -0,0 +1,182 @@
+"""! @brief Splits conversions in shards, and reads back the partial outputs of each shard."""
+
+##
+# @file shard.py
+#
+# @brief Splits conversions in shards, and reads back the partial outputs of each shard.
+#
+# @section description_shard Description
+# With --shard i/N, a program only handles the items whose stable hash, modulo N, is i.
+# The hash is the crc32 of a name that doesn't depend on the machine (a file name, a
+# path relative to the config), so every shard agrees on the split, and adding items
+# doesn't move the others to a different shard.
+#
+# A shard of sprites writes its converted frames as a JSON partial:
+#
+#     {
+#       "version": "0.1.0",
+#       "kind": "frames",
+#       "target": "walk_cycle",
+#       "shard": [0, 4],
+#       "total": 16,
+#       "palettes": [ [[255, 255, 0], [0, 255, 0]] ],
+#       "frames": [ { "index": 3, "source": "walk-cycle/walk-cycle4.png",
+#                     "width": 16, "height": 12, "palette": 0, "indexes": "<base64>" } ]
+#     }
+#
+# A shard of a batch with shared palettes writes the palettes of its targets next to the
+# shared header, as <header>.<i>-of-<N>.json, with kind "palettes".
+#
+# @section libraries_main Libraries/Modules
+# - base64 standard library (https://docs.python.org/3/library/base64.html)
+#   - Access to the index planes encoding.
+# - glob standard library (https://docs.python.org/3/library/glob.html)
+#   - Access to pattern expansion.
+# - json standard library (https://docs.python.org/3/library/json.html)
+#   - Access to partials input and output.
+# - sys standard library (https://docs.python.org/3/library/sys.html)
+#   - Access to stdout.
+# - zlib standard library (https://docs.python.org/3/library/zlib.html)
+#   - Access to crc32.
+#
+# @section notes_shard Notes
+# - Shards are not balanced: each one gets about total/N items.
+# - Remove the palettes partials of an older split before merging a new one.
+#
+# @section todo_shard TODO
+#
+# @section author_shard Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import base64
+import glob
+import json
+import sys
+import zlib
+from .animation import Frame
+from .utils import pop_option
+from .shared_palettes import add_palette
+
+## The partials format version.
+PARTIAL_VERSION = "0.1.0"
+
+def shard_option(argv):
+    """! Removes the "--shard i/N" option from the argument list. Exits on a malformed value.
+    @param argv   The argument list.
+    @return  A tuple of: (i, N) (None if no --shard), argument list.
+    """
+    (value, argv) = pop_option(argv, "--shard")
+    if value is None:
+        return (None, argv)
+    try:
+        (index, count) = (int(n) for n in value.split("/"))
+    except ValueError:
+        index = count = -1
+    if not 0 <= index < count:
+        print(f"Unexpected --shard value: {value}, expected <i>/<N> with 0 <= i < N")
+        sys.exit(1)
+    return ((index, count), argv)
+
+def in_shard(key, shard):
+    """! Checks if the item with the passed stable name belongs to the (i, N) shard."""
+    return shard is None or zlib.crc32(key.encode("utf-8")) % shard[1] == shard[0]
+
+def write_partial(partial, out=sys.stdout):
+    """! Writes a partial as compact JSON."""
+    json.dump({"version": PARTIAL_VERSION, **partial}, out, separators=(",", ":"))
+    out.write("\n")
+
+def read_partial(path, kind):
+    """! Reads a partial of the passed kind. Returns None, after logging, if it isn't one."""
+    with open(path, encoding="utf-8") as partial_fp:
+        partial = json.load(partial_fp)
+    if partial.get("version") != PARTIAL_VERSION or partial.get("kind") != kind:
+        print(f"[ERROR] {path} is not a v{PARTIAL_VERSION} {kind} partial.")
+        return None
+    return partial
+
+def complete_shards(partials, names):
+    """! Checks that the partials hold each shard of the same split exactly once.
+    @param partials   The partials.
+    @param names   The name of each partial, for the log.
+    """
+    count = partials[0]["shard"][1]
+    found = sorted(partial["shard"][0] for partial in partials)
+    if any(partial["shard"][1] != count for partial in partials):
+        print(f"[ERROR] Partials of different splits: {', '.join(names)}")
+        return False
+    if found != list(range(count)):
+        print(f"[ERROR] Expected shards 0 to {count - 1} once each, found: {found}")
+        return False
+    return True
+
+def frames_partial(target_name, shard, total, entries):
+    """! Builds the partial for the frames converted by a shard.
+    @param target_name   The target name.
+    @param shard   The (i, N) shard.
+    @param total   The number of frames of the whole target.
+    @param entries   The (index, source, Frame) of each frame in the shard.
+    @return  The partial, ready for write_partial().
+    """
+    palettes = {}
+    frames = []
+    for index, source, frame in entries:
+        frames.append({"index": index, "source": source, "width": frame.width,
+                       "height": frame.height,
+                       "palette": palettes.setdefault(frame.palette, len(palettes)),
+                       "indexes": base64.b64encode(frame.indexes).decode("ascii")})
+    return {"kind": "frames", "target": target_name, "shard": list(shard), "total": total,
+            "palettes": [list(palette) for palette in palettes], "frames": frames}
+
+def merge_frames(paths):
+    """! Reads the frames partials of every shard of a target.
+    @param paths   The partial files, one per shard.
+    @return  A tuple of: target name, frames, sources; in the order of the whole target.
+             None if the partials don't hold every frame once.
+    """
+    partials = [read_partial(path, "frames") for path in paths]
+    if None in partials or not complete_shards(partials, paths):
+        return None
+    target_name = partials[0]["target"]
+    total = partials[0]["total"]
+    if any(partial["target"] != target_name or partial["total"] != total
+           for partial in partials):
+        print(f"[ERROR] Partials of different targets: {', '.join(paths)}")
+        return None
+    frames = [None] * total
+    sources = [None] * total
+    for partial in partials:
+        for entry in partial["frames"]:
+            frames[entry["index"]] = Frame(base64.b64decode(entry["indexes"]), entry["width"],
+                                           entry["height"],
+                                           partial["palettes"][entry["palette"]])
+            sources[entry["index"]] = entry["source"]
+    missing = [idx for idx, frame in enumerate(frames) if frame is None]
+    if missing:
+        print(f"[ERROR] Frames missing from the partials of {target_name}: {missing}")
+        return None
+    return (target_name, frames, sources)
+
+def palettes_partial_path(header_path, shard):
+    """! Returns the partial file for the shared palettes of a shard."""
+    return f"{header_path}.{shard[0]}-of-{shard[1]}.json"
+
+def merge_palettes(header_path):
+    """! Reads the shared palettes partials written next to header_path by every shard.
+    @return  The dict of palette symbol to palette, or None if some shard is missing, or two
+             shards have different palettes with the same symbol.
+    """
+    paths = sorted(glob.glob(glob.escape(header_path) + ".*-of-*.json"))
+    if not paths:
+        print(f"[ERROR] No shared palettes partials found for {header_path}.")
+        return None
+    partials = [read_partial(path, "palettes") for path in paths]
+    if None in partials or not complete_shards(partials, paths):
+        return None
+    palettes = {}
+    for partial in partials:
+        for symbol, palette in partial["palettes"].items():
+            if not add_palette(palettes, symbol, tuple(tuple(color) for color in palette)):
+                return None
+    return palettes
@@ -0,0 +1,87 @@
+"""! @brief Collects the palettes of many targets, printing each distinct palette once."""
+
+##
+# @file shared_palettes.py
+#
+# @brief Collects the palettes of many targets, printing each distinct palette once.
+#
+# @section description_shared_palettes Description
+# The C-header-exp and C-impl-exp outputs of a project can share their palettes: each
+# distinct compacted palette is then printed once, in a shared header and C file.
+# A palette is named after a hash of its colors, e.g. s4c_palette_1a2b3c4d5e6f7a8b, so its
+# name does not depend on which targets use it, or on their order. Two different palettes
+# with the same name are an error, rather than one of them silently getting the other's
+# colors.
+#
+# The header of each target includes the shared header, and maps its own palette name to
+# the shared one:
+#
+#     #include "palettes.h"
+#     #define walk_cycle_palette s4c_palette_1a2b3c4d5e6f7a8b
+#
+# @section libraries_main Libraries/Modules
+# - os standard library (https://docs.python.org/3/library/os.html)
+#   - Access to path functions.
+#
+# @section notes_shared_palettes Notes
+# - Palettes are printed sorted by name.
+#
+# @section todo_shared_palettes TODO
+#
+# @section author_shared_palettes Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import os
+from .utils import palette_symbol
+from .utils import print_animation_header
+from .utils import print_palette_as_s4c_color_array
+from .utils import print_wrapped_s4c_inclusion
+
+## The file format version.
+FILE_VERSION = "0.1.0"
+
+def add_palette(palettes, symbol, palette):
+    """! Adds a palette to a dict of palette symbol to palette.
+    @return  False if another palette already has the symbol.
+    """
+    known = palettes.setdefault(symbol, palette)
+    if known != palette:
+        print(f"[ERROR] Two different palettes are named {symbol}:\n\t{list(known)}\n"
+              f"\t{list(palette)}")
+        return False
+    return True
+
+def collect_palettes(animations):
+    """! Returns a dict of palette symbol to the compacted palette of each animation.
+    Returns None if two different palettes have the same symbol.
+    """
+    palettes = {}
+    for animation in animations:
+        palette = animation.compacted().palette
+        if not add_palette(palettes, palette_symbol(palette), palette):
+            return None
+    return palettes
+
+def print_shared_palettes(mode, palettes, header_path, s4c_path):
+    """! Print the shared palettes header or C file.
+    @param mode   The output mode, header or cfile.
+    @param palettes   The dict of palette symbol to palette, as from collect_palettes().
+    @param header_path   The shared palettes header, included by the C file.
+    @param s4c_path   The path to sprites4curses dir (for includes).
+    """
+    header_name = os.path.basename(header_path)
+    if mode == "header":
+        guard = os.path.splitext(header_name)[0].replace("-", "_")
+        print_animation_header(guard, FILE_VERSION,
+                               "Declares the palettes shared by the generated animations.")
+        print_wrapped_s4c_inclusion(s4c_path)
+        for symbol in sorted(palettes):
+            print(f"extern S4C_Color {symbol}[{len(palettes[symbol])}+1];")
+        print(f"\n#endif // {guard.upper()}_S4C_H_")
+    elif mode == "cfile":
+        print(f"#include \"{header_name}\"")
+        for symbol in sorted(palettes):
+            print(f"\nS4C_Color {symbol}[{len(palettes[symbol])}+1] = {{")
+            print_palette_as_s4c_color_array(palettes[symbol], symbol)
+            print("};")
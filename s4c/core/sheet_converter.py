@@ -35,24 +35,38 @@
 #
 # @section author_spritesheet Author(s)
 # - Created by jgabaut on 24/02/2023.
-# - Modified by jgabaut on 19/01/2024.
+# - Modified by jgabaut on 19/10/2026.
 
 # Imports
 import sys
 import os
 from PIL import Image
 from .utils import convert_mode_lit
-from .utils import print_heading
-from .utils import print_impl_ending
-from .utils import get_converted_char
-from .utils import new_char_map
+from .utils import MODES
+from .utils import print_animation
 from .utils import log_wrong_argnum
 from .utils import intparse_args
+from .utils import pop_flag
+from .utils import pop_option
 from .utils import SheetArgs
+from .png_resize import resize_option
+from .animation import Frame
+from .bands import iter_band_cells
+from .bands import sheet_grid
+from .bands import row_cells
+from .grid import auto_grid_args
+from .atlas import atlas_entry
+from .blank import BLANK_POLICIES
+from .blank import convert_cells
+from .lut import METRICS
+from .validate import validated_animation
 
 ## The file format version.
 FILE_VERSION = "0.2.3"
-SCRIPT_VERSION = "0.1.1"
+SCRIPT_VERSION = "0.1.2"
+F_STR_OPTS = "[--stream] [--auto-grid] [--blank <policy> [--metric <metric>]]\
+ [--report <report.json>] [--atlas <atlas.json>] [--resize <w>x<h> [--resample <method>]]\
+ [--s4c_path <s4c_path]"
 F_STR_ARGS = "<mode> <sheet> <sprite_width> <sprite_heigth> <separator_size> <start_x> <start_y>"
 EXPECTED_ARGS = 7
 
@@ -66,110 +80,158 @@ def usage():
  sep size,\
  left corner of first sprite's X, Y."
     print(f"Wrong arguments. Needed: {f_string_usage}")
-    print(f"\nUsage:\tpython {os.path.basename(__file__)} [--s4c_path <s4c_path] {F_STR_ARGS}")
-    print("\n    mode:\n\t  s4c-file\n\t  C-header\n\t  C-impl")
+    print(f"\nUsage:\tpython {os.path.basename(__file__)} {F_STR_OPTS} {F_STR_ARGS}")
+    print("\n    mode:\n\t  s4c-file\n\t  C-header\n\t  C-impl\n\t  C-header-fit\n\t  C-impl-fit")
+    print("\t  C-header-packed\n\t  C-impl-packed")
+    print("\n    --stream:\tdecode the sheet one row of sprites at a time, to save memory")
+    print("    --report:\twrite the frame validation report as JSON")
+    print("    --auto-grid:\tdetect sprite size, separator and start from the sheet,")
+    print("\t\tinstead of passing them")
+    print(f"    --blank:\twhat to do with empty or flat cells: {', '.join(BLANK_POLICIES)}")
+    print(f"    --metric:\thow shared blank cells get the nearest color: {', '.join(METRICS)}")
+    print("    --atlas:\tconvert an animation packed in an atlas: pass its name instead of")
+    print("\t\tthe sheet, and no geometry")
+    print("    --resize:\tcrop and resize each sprite in memory, as png_resize does")
+    print("    --resample:\tthe png_resize method for --resize: bicubic, nearest or reduce")
     sys.exit(1)
 
-def parse_sprite(sprite, rgb_palette, char_map):
-    """! Parse sprite using the palette and charmap, returns char array."""
-    chars = []
-    curr_color = (0, 0, 0)
-    for y in range(sprite.size[1]):
-        line = ""
-        for x in range(sprite.size[0]):
-            color_index = sprite.getpixel((x, y))
-            curr_color = rgb_palette[color_index]
-            char = get_converted_char(char_map, curr_color[0], curr_color[1], curr_color[2])
-            line += char
-        chars.append(line)
-    return chars
-
-
-def convert_spritesheet(mode, filename, s: SheetArgs, *args):
+def sheet_cells(img, s: SheetArgs):
+    """! Yields each sprite cropped from the loaded spritesheet, row by row."""
+    (rows, columns) = sheet_grid(img.size, s)
+    for k in range(rows):
+        for j in range(row_cells(k, columns, s)):
+            spr_x = s.start_x + j * (s.sprite_width + s.sep_size)
+            spr_y = s.start_y + k * (s.sprite_height + s.sep_size)
+            yield img.crop((spr_x, spr_y, spr_x + s.sprite_width , spr_y + s.sprite_height))
+
+def convert_cell(cell):
+    """! Converts a sprite cell to a Frame."""
+    return Frame.from_image(cell.convert('P', palette=Image.Palette.ADAPTIVE, colors=256))
+
+def palette_cells(cells, flat_palette):
+    """! Maps each cell back to the palette of the indexed frames it was pasted from.
+    Cells only hold colors of that palette, so each pixel gets an index of its own color.
+    @param cells   The cells to map.
+    @param flat_palette   The [r,g,b,r,g,b...] palette, as in the atlas index.
+    """
+    palette_img = Image.new('P', (1, 1))
+    palette_img.putpalette(flat_palette)
+    return (cell.convert('RGB').quantize(palette=palette_img, dither=Image.Dither.NONE)
+            for cell in cells)
+
+def sheet_frames(filename, s: SheetArgs, stream=False, resize=None, **opts):
+    """! Converts each sprite in a spritesheet to a Frame.
+    @param filename   The input spritesheet file.
+    @param s   The sheet geometry.
+    @param stream   If True, decode the sheet one row of cells at a time.
+    @param resize   If set, called on each sprite before converting it.
+    @param opts   If opaque is True, cells are converted as RGB, dropping an alpha band they
+                  don't use. If palette is set, cells are mapped back to it before resizing,
+                  see palette_cells(). The rest are the convert_cells() options: blank, metric.
+    @return  A tuple of: frames, sources (the sprite number of each frame).
+    """
+    if stream:
+        cells = (cell for _, _, cell in iter_band_cells(filename, s))
+    else:
+        cells = sheet_cells(Image.open(filename), s)
+    if opts.pop("opaque", False):
+        cells = (cell.convert('RGB') for cell in cells)
+    palette = opts.pop("palette", None)
+    if palette is not None:
+        cells = palette_cells(cells, palette)
+    if resize is not None:
+        cells = (resize(cell) for cell in cells)
+
+    return convert_cells(cells, convert_cell, **opts)
+
+def sheet_animation(filename, s: SheetArgs, report_path=None, **opts):
+    """! Converts each sprite in a spritesheet, then checks them all.
+    @param filename   The input spritesheet file.
+    @param s   The sheet geometry.
+    @param report_path   If set, the frame validation report is written there as JSON.
+    @param opts   The sheet_frames() options: stream, resize, opaque, palette, blank, metric.
+    @return  The Animation, or None if some sprites do not match the first one.
+    """
+    (frames, sources) = sheet_frames(filename, s, **opts)
+    return validated_animation(frames, sources, report_path)
+
+def convert_spritesheet(mode, filename, s: SheetArgs, *args, target_name=None, **opts):
     """! Converts a spritesheet to a 3D char array repr of pixel color.
     The prints it with the needed brackets and commas.
     Depending on mode (s4c-file, C-header, C-impl) there will be a different output.
     @param mode    The mode for output generation.
     @param filename   The input spritesheet file.
+    @param target_name   The name used in the output, the sheet file name if None.
+    @param opts   The sheet_animation() options: report_path, stream, resize, opaque, palette,
+                  blank, metric.
     """
 
-    if mode not in ('s4c', 'header', 'cfile', 'header-exp', 'cfile-exp') :
+    if mode not in MODES:
         print(f"Unexpected mode value in convert_spritesheet(): {mode}")
         usage()
     if mode in ('header-exp', 'cfile-exp') and len(args) < 1:
         print(f"Missing s4c_path in convert_spritesheet(): {mode}")
         usage()
 
-    target_name = os.path.splitext(os.path.basename(filename))[0].replace("-","_")
+    if target_name is None:
+        target_name = os.path.splitext(os.path.basename(filename))[0].replace("-","_")
 
-    img = Image.open(filename)
+    animation = sheet_animation(filename, s, **opts)
+    if animation is None:
+        return False
 
-    #for i in range(img.size[1] // (sprite_h + sep_size * (sprites_per_column - 1))):
-
-    target_sprites = []
-    for k in range((img.size[0] - s.start_x + s.sep_size) // (s.sprite_width + s.sep_size)):
-        for j in range((img.size[1] - s.start_y + s.sep_size) // (s.sprite_height + s.sep_size)):
-            spr_x = s.start_x + j * (s.sprite_width + s.sep_size)
-            #+ (sep_size if j > 0 else 0)
-            spr_y = s.start_y + k * (s.sprite_height + s.sep_size)
-            #+ k * (sprite_h + sep_size * (sprites_per_column - 1))
-                # + (sep_size if k > 0 else 0)
-            sprite = img.crop((spr_x, spr_y, spr_x + s.sprite_width , spr_y + s.sprite_height))
-
-            sprite = sprite.convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
-            rgb_palette = [(sprite.getpalette()[n],
-                            sprite.getpalette()[n+1],
-                            sprite.getpalette()[n+2])
-                           for n in range(0, len(sprite.getpalette()), 3)]
-
-            # Create the char_map dictionary based on the color values
-            char_map = new_char_map(rgb_palette)
-
-            chars = parse_sprite(sprite, rgb_palette, char_map)
-
-            if len(target_sprites) == 0:
-                target_sprites.append([chars, sprite.size[0], sprite.size[1],
-                                       rgb_palette, len(rgb_palette)])
-            else:
-                if rgb_palette != target_sprites[0][3]: #Must have same palette as first sprite
-                    print(f"\n\n[ERROR] at sprite #{len(target_sprites)}: palette mismatch\n")
-                    print(f"\texpected: {target_sprites[0][3]}")
-                    print(f"\tfound: {rgb_palette}\n")
-                    print("All frames must use the same palette.\n")
-                    return False
-                if sprite.size[0] != target_sprites[0][1]: #Must have same width as first sprite
-                    print(f"\n\n[ERROR] at sprite #{len(target_sprites)}: width mismatch\n")
-                    print(f"\texpected: {target_sprites[0][1]}")
-                    print(f"\tfound: {sprite.size[0]}\n")
-                    print("All frames must have the same width.\n")
-                    return False
-                if sprite.size[1] != target_sprites[0][2]: #Must have same height as first sprite
-                    print(f"\n\n[ERROR] at sprite #{len(target_sprites)}: height mismatch\n")
-                    print(f"\texpected: {target_sprites[0][2]}")
-                    print(f"\tfound: {sprite.size[1]}\n")
-                    print("All frames must have the same height.\n")
-                    return False
-
-                target_sprites.append([chars, sprite.size[0], sprite.size[1],
-                                   rgb_palette, len(rgb_palette)])
-
-    if len(args) == 0:
-        if print_heading(mode, target_name, FILE_VERSION, (len(target_sprites),
-                                                           target_sprites[0][4],
-                                                           target_sprites[0][1],
-                                                           target_sprites[0][2]), ("NONE",)):
-            return True
-    else:
-        if print_heading(mode, target_name, FILE_VERSION, (len(target_sprites),
-                                                           target_sprites[0][4],
-                                                           target_sprites[0][1],
-                                                           target_sprites[0][2]), args[0]):
-            return True
-    print_impl_ending(mode, target_name, len(target_sprites), target_sprites)
+    s4c_path = args[0] if len(args) > 0 else ("NONE",)
+    print_animation(mode, target_name, FILE_VERSION, animation, s4c_path)
     return True
 
+def convert_atlas_animation(mode, index_file, name, *args, **opts):
+    """! Converts an animation packed in an atlas, as convert_spritesheet() does.
+    @param index_file   The atlas index file.
+    @param name   The animation name, also used in the output.
+    """
+    entry = atlas_entry(index_file, name)
+    if entry is None:
+        sys.exit(1)
+    (atlas, s, alpha, palette) = entry
+    return convert_spritesheet(mode, atlas, s, *args, target_name=name, opaque=not alpha,
+                               palette=palette, **opts)
+
+def pop_convert_options(argv):
+    """! Pops the conversion options from argv, exiting on unexpected values.
+    @return  A tuple of: the options for convert_spritesheet(), the remaining argv.
+    """
+    stream, argv = pop_flag(argv, "--stream")
+    (report_path, argv) = pop_option(argv, "--report")
+    (blank, argv) = pop_option(argv, "--blank")
+    if blank is not None and blank not in BLANK_POLICIES:
+        print(f"Unexpected --blank value: {blank}")
+        usage()
+    (metric, argv) = pop_option(argv, "--metric")
+    if metric is not None and metric not in METRICS:
+        print(f"Unexpected --metric value: {metric}")
+        usage()
+    (resize, argv) = resize_option(argv)
+    opts = {"stream": stream, "report_path": report_path, "blank": blank or "keep",
+            "metric": metric or "euclidean", "resize": resize}
+    return (opts, argv)
+
 def main(argv):
     """! Main program entry."""
+    (opts, argv) = pop_convert_options(argv)
+    (atlas_index, argv) = pop_option(argv, "--atlas")
+    if atlas_index is not None and len(argv) - 1 in (EXPECTED_ARGS - 5, EXPECTED_ARGS - 3):
+        if len(argv) - 1 == EXPECTED_ARGS - 3:
+            if argv[1] != "--s4c_path":
+                usage()
+            convert_atlas_animation(convert_mode_lit(argv[3]), atlas_index, argv[4], argv[2],
+                                    **opts)
+        else:
+            convert_atlas_animation(convert_mode_lit(argv[1]), atlas_index, argv[2], **opts)
+        return
+    auto_grid, argv = pop_flag(argv, "--auto-grid")
+    if auto_grid and len(argv) - 1 in (EXPECTED_ARGS - 5, EXPECTED_ARGS - 3):
+        # The detected geometry is logged to stderr, stdout is for the generated code
+        argv = argv + auto_grid_args(argv[-1], sys.stderr)
     if (len(argv) -1) != EXPECTED_ARGS:
         if (len(argv) == 2 and argv[1] in ('version', '-v', '--version')):
             print(f"sheet_converter v{SCRIPT_VERSION}")
@@ -185,7 +247,8 @@ def main(argv):
             filename = argv[4]
             ints = intparse_args(argv[5], argv[6], argv[7], argv[8], argv[9])
             convert_spritesheet(mode,filename,
-                                SheetArgs(ints[0],ints[1],ints[2],ints[3],ints[4]),s4c_path)
+                                SheetArgs(ints[0],ints[1],ints[2],ints[3],ints[4]),s4c_path,
+                                **opts)
         else:
             log_wrong_argnum(EXPECTED_ARGS, argv)
             usage()
@@ -194,7 +257,8 @@ def main(argv):
         mode = convert_mode_lit(mode)
         filename = argv[2]
         ints = intparse_args(argv[3], argv[4], argv[5], argv[6], argv[7])
-        convert_spritesheet(mode,filename,SheetArgs(ints[0],ints[1],ints[2],ints[3],ints[4]))
+        convert_spritesheet(mode,filename,SheetArgs(ints[0],ints[1],ints[2],ints[3],ints[4]),
+                            **opts)
 
 if __name__ == "__main__":
     main(sys.argv)
@@ -32,20 +32,38 @@
 #
 # @section author_sprites Author(s)
 # - Created by jgabaut on 24/02/2023.
-# - Modified by jgabaut on 31/01/2025.
+# - Modified by jgabaut on 19/10/2026.
 
 # Imports
 import sys
+import functools
 import glob
+import io
+import time
 import re
 import os
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
+from PIL import ImageSequence
 from .utils import convert_mode_lit
+from .utils import MODES
+from .utils import print_animation
 from .utils import print_heading
-from .utils import print_impl_ending
-from .utils import get_converted_char
-from .utils import new_char_map
+from .utils import parse_emit
+from .utils import emit_outputs
 from .utils import log_wrong_argnum
+from .utils import pop_option
+from .utils import pop_flag
+from .png_resize import resize_option
+from .shard import shard_option
+from .shard import in_shard
+from .shard import frames_partial
+from .shard import write_partial
+from .animation import Frame
+from .animation import Animation
+from .validate import validated_animation
+from .prefetch import IOStats
+from .prefetch import prefetch
 
 ## The file format version.
 FILE_VERSION = "0.2.3"
@@ -54,133 +72,276 @@ EXPECTED_ARGS = 2
 
 # Expects the sprite directory name as first argument.
 # File names format inside the directory should be "imageNUM.png".
+# A multi-frame image file (GIF, APNG) can be passed instead of the directory.
 
 # Functions
 def usage():
     """! Prints correct invocation."""
-    print("Wrong arguments. Needed: mode, sprites directory")
+    print("Wrong arguments. Needed: mode, sprites directory or multi-frame image")
     print(f"\nUsage:\tpython {os.path.basename(__file__)}\
- [--s4c_path <s4c_path>]\
- <mode> <sprites_directory>")
-    print("\n  mode:  \n\ts4c-file\n\tC-header\n\tC-impl")
+ [--jobs <n>] [--report <report.json>] [--resize <w>x<h> [--resample <method>]]\
+ [--prefetch <depth>] [--io-stats] [--s4c_path <s4c_path>]\
+ <mode> <sprites_directory | animation.gif | animation.png>")
+    print(f"\tpython {os.path.basename(__file__)} [options] [--s4c_path <s4c_path>]\
+ --emit <mode>=<file>[,<mode>=<file>...] <sprites_directory | animation>")
+    print(f"\tpython {os.path.basename(__file__)} [options] --shard <i>/<N>\
+ <sprites_directory | animation>")
+    print("\n  mode:  \n\ts4c-file\n\tC-header\n\tC-impl\n\tC-header-fit\n\tC-impl-fit")
+    print("\tC-header-packed\n\tC-impl-packed")
+    print("\n  --jobs:\tconvert frames with n worker processes, for a sprites directory")
+    print("  --report:\twrite the frame validation report as JSON")
+    print("  --resize:\tcrop and resize each frame in memory, as png_resize does")
+    print("  --resample:\tthe png_resize method for --resize: bicubic, nearest or reduce")
+    print("  --prefetch:\tread up to depth files ahead with threads, while converting")
+    print("  --io-stats:\tprint time blocked on reads and spent converting, to stderr")
+    print("  --emit:\twrite each requested mode to its file, converting the frames once")
+    print("  --shard:\tconvert only the frames of shard i out of N, writing a partial for merge")
     sys.exit(1)
 
-def convert_sprite(file):
-    """! Takes a image and converts each pixel to a char for its color (closest match to char_map).
+def convert_sprite(file, resize=None):
+    """! Takes a image and converts each pixel to the index of its color in an adaptive palette.
 
     @param file   The image file to convert.
+    @param resize   If set, called on the image before converting it.
 
-    @return  A tuple of : char matrix, width, height, rbg palette, palette size.
+    @return  A Frame holding the index plane, width, height and rgb palette.
     """
     img = Image.open(file)
+    if resize is not None:
+        img = resize(img)
 
     # Convert the image to an RGB mode image with 256 colors
     img = img.convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
 
-    # Get the color palette
-    palette = img.getpalette()
+    return Frame.from_image(img)
 
-    # Map the color indices to their RGB values in the palette
-    rgb_palette = [(palette[i], palette[i+1], palette[i+2]) for i in range(0, len(palette), 3)]
+def sprite_files(direc):
+    """! Returns the png files in the passed directory, sorted by the number in their name."""
+    return sorted(glob.glob(f"{direc}/*.png"),
+                  key=lambda f:
+                  int(re.search(r'\d+', f).group()))
 
-    palette_size = len(rgb_palette)
+def convert_prefetched(files, resize=None, depth=0, io_stats=False):
+    """! Converts each file with convert_sprite(), while threads read the next ones.
+    @param depth   How many files are read ahead.
+    @param io_stats   If True, prints the time blocked on reads and spent converting.
+    @return  The list of Frames, in the same order as files.
+    """
+    stats = IOStats()
+    frames = []
+    for _, data in prefetch(files, depth, stats):
+        start = time.perf_counter()
+        frames.append(convert_sprite(io.BytesIO(data), resize))
+        stats.encode += time.perf_counter() - start
+    if io_stats:
+        stats.print()
+    return frames
+
+def convert_sprites(files, jobs=1, resize=None, **read_opts):
+    """! Converts each file with convert_sprite(), using jobs worker processes.
+    @param read_opts   The convert_prefetched() options, used without worker processes:
+                       depth, io_stats.
+    @return  The list of Frames, in the same order as files.
+    """
+    convert = functools.partial(convert_sprite, resize=resize)
+    if jobs <= 1 or len(files) <= 1:
+        if read_opts.get("depth") or read_opts.get("io_stats"):
+            return convert_prefetched(files, resize, **read_opts)
+        return [convert(file) for file in files]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(convert, files, chunksize=max(1, len(files) // (jobs * 4))))
+
+def convert_sequence(file, resize=None, keep=None):
+    """! Converts each frame of a multi-frame image (GIF, APNG) like convert_sprite() does.
+    Frames are decoded lazily, so only one decoded frame is held at a time.
+    Frames are converted to RGB first, since the following ones may not share the first's mode.
 
-    # Create the char_map dictionary based on the color values
-    char_map = new_char_map(rgb_palette)
+    @param file   The image file to convert.
+    @param resize   If set, called on each frame before converting it.
+    @param keep   If set, only the frames whose number passes keep() are converted.
 
-    # Convert each pixel to its corresponding character representation
-    r, g, b = 0, 0, 0
-    chars = []
-    for y in range(img.size[1]): #Height
-        line = ""
-        for x in range(img.size[0]): #Width
-            color_index = img.getpixel((x, y))
-            r, g, b = rgb_palette[color_index]
-            char = get_converted_char(char_map, r, g, b)
-            line += char
+    @return  A generator of Frames.
+    """
+    with Image.open(file) as img:
+        for idx, frame in enumerate(ImageSequence.Iterator(img)):
+            if keep is not None and not keep(idx):
+                continue
+            frame = frame.convert('RGB')
+            if resize is not None:
+                frame = resize(frame)
+            yield Frame.from_image(frame.convert('P', palette=Image.Palette.ADAPTIVE, colors=256))
 
-        chars.append(line)
+def load_frames(path, jobs=1, resize=None, **read_opts):
+    """! Converts the frames of a sprites directory, or of a multi-frame image.
+    @param path   The sprites directory, or the image file.
+    @param jobs   The number of worker processes converting the frames of a directory.
+    @param resize   If set, called on each image before converting it.
+    @param read_opts   The convert_prefetched() options for a directory: depth, io_stats.
+    @return  A tuple of: target name, frames, sources (a name for each frame).
+    """
+    if os.path.isfile(path):
+        target_name = os.path.splitext(os.path.basename(path))[0].replace("-","_")
+        frames = list(convert_sequence(path, resize))
+        return (target_name, frames, [f"{path} frame {idx}" for idx in range(len(frames))])
+    target_name = os.path.basename(os.path.normpath(path)).replace("-","_")
+    files = sprite_files(path)
+    return (target_name, convert_sprites(files, jobs, resize, **read_opts), files)
 
-    return (chars, img.size[0], img.size[1], rgb_palette, palette_size)
+def shard_frames(path, shard, jobs=1, resize=None, **read_opts):
+    """! Converts the frames of a shard of a sprites directory, or of a multi-frame image.
+    Frames go to shards by file name, or by frame number for a multi-frame image.
+    @param path   The sprites directory, or the image file.
+    @param shard   The (i, N) shard.
+    @return  The partial for the shard, as from frames_partial().
+    """
+    if os.path.isfile(path):
+        target_name = os.path.splitext(os.path.basename(path))[0].replace("-","_")
+        with Image.open(path) as img:
+            total = getattr(img, "n_frames", 1)
+        indexes = [idx for idx in range(total) if in_shard(str(idx), shard)]
+        frames = convert_sequence(path, resize, keep=lambda idx: in_shard(str(idx), shard))
+        sources = [f"{path} frame {idx}" for idx in indexes]
+    else:
+        target_name = os.path.basename(os.path.normpath(path)).replace("-","_")
+        files = sprite_files(path)
+        total = len(files)
+        indexes = [idx for idx, file in enumerate(files)
+                   if in_shard(os.path.basename(file), shard)]
+        sources = [files[idx] for idx in indexes]
+        frames = convert_sprites(sources, jobs, resize, **read_opts)
+    return frames_partial(target_name, shard, total, zip(indexes, sources, frames))
+
+def sprites_animation(direc, report_path=None, **opts):
+    """! Converts the sprites, then checks them all.
+    @param direc   The directory of image files to convert, or a multi-frame image.
+    @param report_path   If set, the frame validation report is written there as JSON.
+    @param opts   The load_frames() options: jobs, resize, depth, io_stats.
+    @return  A tuple of: target name, Animation (None if some frames do not match).
+    """
+    (target_name, frames, sources) = load_frames(direc, **opts)
+    return (target_name, validated_animation(frames, sources, report_path))
+
+def header_sizes(direc, modes, resize=None):
+    """! Returns the print_heading() sizes for header modes, without converting every frame.
+    C-header only needs the frame count. The other header modes also need the first frame,
+    for the frame size and the compacted palette size: when the first frame uses every
+    color of its palette, the other frames share that palette and can't add any.
+    That size is then also the chars the fit modes need, see fit_chars().
+    @param direc   The directory of image files, or a multi-frame image.
+    @param modes   The requested header modes.
+    @param resize   If set, called on the first image before converting it.
+    @return  The sizes, or None if every frame has to be converted.
+    """
+    files = None
+    if os.path.isfile(direc):
+        with Image.open(direc) as img:
+            count = getattr(img, "n_frames", 1)
+    else:
+        files = sprite_files(direc)
+        count = len(files)
+    if count == 0:
+        return None
+    if modes <= {"header"}:
+        return (count, 0, 0, 0)
+    if files is None:
+        first = next(convert_sequence(direc, resize))
+    else:
+        first = convert_sprite(files[0], resize)
+    animation = Animation.from_frames([first])
+    palette_used = len(animation.used_indexes()) == animation.palette_size
+    if not palette_used:
+        return None
+    return (count, animation.compacted().palette_size, animation.width, animation.height)
 
-def print_converted_sprites(mode, direc, *args):
+def emit_converted_sprites(outputs, direc, *args, **opts):
+    """! Converts the sprites once, then writes each requested output.
+    Header-only runs just read the frame count, and the first frame if needed. With a
+    report_path they convert and validate every frame, so the report is the same as with
+    impl outputs.
+    @param outputs   The list of (mode, output file).
+    @param direc   The directory of image files to convert, or a multi-frame image.
+    @param opts   The sprites_animation() options: report_path, jobs, resize, depth, io_stats.
+    """
+    modes = {mode for mode, _ in outputs}
+    if modes & {'header-exp', 'cfile-exp'} and len(args) < 1:
+        print(f"Missing s4c_path in emit_converted_sprites(): {', '.join(sorted(modes))}")
+        usage()
+    s4c_path = args[0] if len(args) > 0 else ("NONE",)
+
+    if not opts.get("report_path") and modes <= {'header', 'header-exp', 'header-fit',
+                                                 'header-packed'}:
+        sizes = header_sizes(direc, modes, opts.get("resize"))
+        if sizes is not None:
+            target_name = os.path.basename(os.path.normpath(direc))
+            if os.path.isfile(direc):
+                target_name = os.path.splitext(target_name)[0]
+            emit_outputs(outputs, print_heading, target_name.replace("-","_"), FILE_VERSION,
+                         sizes, s4c_path)
+            return True
+
+    (target_name, animation) = sprites_animation(direc, **opts)
+    if animation is None:
+        return False
+    emit_outputs(outputs, print_animation, target_name, FILE_VERSION, animation, s4c_path)
+    return True
+
+def print_converted_sprites(mode, direc, *args, report_path=None, **opts):
     """! Takes a mode (s4c, header, cfile) and a dir with images, calls convert_sprite on each one.
     Outputs the converted sprites to stdout, with the needed brackets for a valid C array decl.
     According to the mode, the file generated is:
       the C header,
       the C file,
       or the version-tagged s4c-file.
-    @param direc   The directory of image files to convert and print.
+    @param direc   The directory of image files to convert and print, or a multi-frame image.
+    @param report_path   If set, the frame validation report is written there as JSON.
+    @param opts   The load_frames() options: jobs, resize, depth, io_stats.
     """
-    if mode not in ('s4c', 'header', 'cfile', 'header-exp', 'cfile-exp') :
+    if mode not in MODES:
         print(f"Unexpected mode value in print_converted_sprites(): {mode}")
         usage()
     if mode in ('header-exp', 'cfile-exp') and len(args) < 1:
         print(f"Missing s4c_path in print_converted_sprites(): {mode}")
         usage()
-    # We start the count from one so we account for one more cell for array declaration
-    frames = 0
-    target_name = os.path.basename(os.path.normpath(direc)).replace("-","_")
-
-    for file in sorted(glob.glob(f"{direc}/*.png"),
-                       key=lambda f:
-                       int(re.search(r'\d+', f).group())):
-        #if frames == 1 :
-            #ref_img = Image.open(file) #Open reference file to get output dimension. WIP
-            #xsize = ref_img.size[0]+1
-            #ysize = ref_img.size[1]+1
-        frames += 1
-
-    target_sprites = []
-    for idx, file in enumerate(sorted(glob.glob(f"{direc}/*.png"),
-                      key=lambda f:
-                      int(re.search(r'\d+', f).group()))):
-        # convert a sprite and print the result
-        (conv_chars, frame_width, frame_height, rbg_palette,
-         palette_size) = convert_sprite(file)
-        if idx == 0:
-            target_sprites.append([conv_chars, frame_width, frame_height,
-                               rbg_palette, palette_size])
-        else:
-            if rbg_palette != target_sprites[0][3]: #Must have same palette as first sprite
-                print(f"\n\n[ERROR] at file #{idx}: {file}: palette mismatch\n")
-                print(f"\texpected: {target_sprites[0][3]}")
-                print(f"\tfound: {rbg_palette}\n")
-                print("All frames must use the same palette.\n")
-                return False
-            if frame_width != target_sprites[0][1]: #Must have same width as first sprite
-                print(f"\n\n[ERROR] at file #{idx}: {file}: width mismatch\n")
-                print(f"\texpected: {target_sprites[0][1]}")
-                print(f"\tfound: {frame_width}\n")
-                print("All frames must have the same width.\n")
-                return False
-            if frame_height != target_sprites[0][2]: #Must have same height as first sprite
-                print(f"\n\n[ERROR] at file #{idx}: {file}: height mismatch\n")
-                print(f"\texpected: {target_sprites[0][2]}")
-                print(f"\tfound: {frame_height}\n")
-                print("All frames must have the same height.\n")
-                return False
-            target_sprites.append([conv_chars, frame_width, frame_height,
-                               rbg_palette, palette_size])
 
-    # Start file output, beginning with version number
+    # convert the sprites, then check them all before printing
+    (target_name, animation) = sprites_animation(direc, report_path, **opts)
+    if animation is None:
+        return False
 
-    if len(args) == 0:
-        if print_heading(mode, target_name, FILE_VERSION,
-                         (frames, target_sprites[0][4], target_sprites[0][1], target_sprites[0][2]),
-                         ("NONE",)):
-            return True
-    else:
-        if print_heading(mode, target_name, FILE_VERSION,
-                         (frames, target_sprites[0][4], target_sprites[0][1], target_sprites[0][2]),
-                         args[0]):
-            return True
-    print_impl_ending(mode, target_name, frames, target_sprites)
+    # Start file output, beginning with version number
+    print_animation(mode, target_name, FILE_VERSION, animation,
+                    args[0] if len(args) > 0 else ("NONE",))
     return True
 
 
 def main(argv):
     """! Main program entry."""
+    (jobs, argv) = pop_option(argv, "--jobs")
+    (report_path, argv) = pop_option(argv, "--report")
+    (resize, argv) = resize_option(argv)
+    (depth, argv) = pop_option(argv, "--prefetch")
+    (io_stats, argv) = pop_flag(argv, "--io-stats")
+    opts = {"jobs": int(jobs) if jobs is not None else 1, "report_path": report_path,
+            "resize": resize, "depth": int(depth) if depth is not None else 0,
+            "io_stats": io_stats}
+    (shard, argv) = shard_option(argv)
+    if shard is not None:
+        if len(argv) != 2:
+            usage()
+        opts.pop("report_path")
+        write_partial(shard_frames(argv[1], shard, **opts))
+        sys.exit(0)
+    (emit, argv) = pop_option(argv, "--emit")
+    if emit is not None:
+        outputs = parse_emit(emit)
+        if outputs is None or len(argv) not in (2, 4) or (len(argv) == 4
+                                                          and argv[1] != "--s4c_path"):
+            usage()
+        if len(argv) == 4:
+            emit_converted_sprites(outputs, argv[3], argv[2], **opts)
+        else:
+            emit_converted_sprites(outputs, argv[1], **opts)
+        sys.exit(0)
     if (len(argv) -1) != EXPECTED_ARGS:
         if (len(argv) == 2 and argv[1] in ('version', '-v', '--version')):
             print(f"sprites v{SCRIPT_VERSION}")
@@ -191,7 +352,7 @@ def main(argv):
             mode = argv[3]
             mode = convert_mode_lit(mode)
             directory = argv[4]
-            print_converted_sprites(mode,directory,s4c_path)
+            print_converted_sprites(mode,directory,s4c_path,**opts)
             sys.exit(0)
         log_wrong_argnum(EXPECTED_ARGS,argv)
         usage()
@@ -199,7 +360,7 @@ def main(argv):
         mode = argv[1]
         mode = convert_mode_lit(mode)
         directory = argv[2]
-        print_converted_sprites(mode,directory)
+        print_converted_sprites(mode,directory,**opts)
 
 if __name__ == '__main__':
     main(sys.argv)
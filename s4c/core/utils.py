@@ -17,8 +17,14 @@
 # - Created by jgabaut on 19/01/2024.
 # - Modified by jgabaut on 31/01/2025.
 
+import contextlib
+import hashlib
 import math
+import sys
 from typing import NamedTuple
+from .packed import bits_per_pixel
+from .packed import row_bytes
+from .packed import pack_rows
 
 class SheetArgs(NamedTuple):
     """! Defines a spritesheet."""
@@ -27,6 +33,10 @@ class SheetArgs(NamedTuple):
     sep_size: int
     start_x: int
     start_y: int
+    ## Cells per row, 0 for as many as fit in the sheet width.
+    columns: int = 0
+    ## Number of cells, 0 for all the cells in the grid. Set for atlas regions.
+    frames: int = 0
 
 def color_distance(c1, c2):
     """! Calculates the distance in color between two rgb tuples.
@@ -42,31 +52,38 @@ def color_distance(c1, c2):
     distance = math.sqrt(red_distance ** 2 + green_distance ** 2 + blue_distance ** 2)
     return distance
 
+## The mode literals accepted on the command line, and their internal mode names.
+MODE_LITERALS = {
+    "s4c-file": "s4c",
+    "C-header": "header",
+    "C-header-exp": "header-exp",
+    "C-impl": "cfile",
+    "C-impl-exp": "cfile-exp",
+    "C-header-fit": "header-fit",
+    "C-impl-fit": "cfile-fit",
+    "C-header-packed": "header-packed",
+    "C-impl-packed": "cfile-packed",
+}
+
 def convert_mode_lit(mode):
     """! Try converting the passed mode string to the internal representation."""
-    if mode == "s4c-file":
-        return "s4c"
-    if mode == "C-header":
-        return "header"
-    if mode == "C-header-exp":
-        return "header-exp"
-    if mode == "C-impl":
-        return "cfile"
-    if mode == "C-impl-exp":
-        return "cfile-exp"
+    if mode in MODE_LITERALS:
+        return MODE_LITERALS[mode]
     print("Error: wrong mode request")
     print(f"--> Found: {mode}")
     print("--> Expected: \'C-impl\' | \'C-header\' | \'s4c-file\'\n")
     return "INVALID"
 
-def print_animation_header(target_name, file_version):
-    """! Print the beginning of animation header for a target."""
+def print_animation_header(target_name, file_version, description=None):
+    """! Print the beginning of animation header for a target.
+    @param description   The header comment, by default the animation declaration one.
+    """
     print(f"#ifndef {target_name.upper()}_S4C_H_")
     print(f"#define {target_name.upper()}_S4C_H_")
     print(f"#define {target_name.upper()}_S4C_H_VERSION \"{file_version}\"")
     print("")
     print("/**")
-    print(f" * Declares animation matrix vector for {target_name}.")
+    print(f" * {description or f'Declares animation matrix vector for {target_name}.'}")
     print(" */")
 
 def print_wrapped_s4c_inclusion(s4c_path):
@@ -81,12 +98,44 @@ def print_wrapped_s4c_inclusion(s4c_path):
     print("#undef S4C_SCRIPTS_PALETTE_ANIMATE_CLEANUP")
     print("#endif //PALETTE_ANIMATE_CLEANUP\n")
 
-def print_heading(mode, target_name, file_version, sizes, s4c_path):
-    """! Print the actual header for a target."""
+def print_packed_heading(target_name, sizes):
+    """! Print the macros and declarations of a packed target, after the guard."""
+    name = target_name.upper()
+    bpp = bits_per_pixel(sizes[1])
+    print("#include <stdint.h>\n")
+    print(f"#define {name}_TOT_FRAMES {sizes[0]}")
+    print(f"#define {name}_TOT_COLORS {sizes[1]}")
+    print(f"#define {name}_FRAME_WIDTH {sizes[2]}")
+    print(f"#define {name}_FRAME_HEIGHT {sizes[3]}")
+    print(f"#define {name}_BPP {bpp}")
+    print(f"#define {name}_PIXELS_PER_BYTE (8/{name}_BPP)")
+    print(f"#define {name}_ROW_BYTES {row_bytes(sizes[2], bpp)}")
+    print(f"#define {name}_PIXEL(frame, x, y) \\")
+    print(f"\t(({target_name}[frame][y][(x) / {name}_PIXELS_PER_BYTE] \\")
+    print(f"\t  >> (({name}_PIXELS_PER_BYTE - 1 - (x) % {name}_PIXELS_PER_BYTE) * {name}_BPP)) \\")
+    print(f"\t & ((1 << {name}_BPP) - 1))")
+    print(f"extern const uint8_t {target_name}{packed_dimensions(target_name)};\n")
+    print(f"extern const uint8_t {target_name}_palette[{name}_TOT_COLORS][3];\n")
+
+## Hex digits of the palette hash in palette_symbol(), 64 bits.
+PALETTE_SYMBOL_DIGITS = 16
+
+def palette_symbol(rgb_palette):
+    """! Returns the name of a palette in the shared palettes file, from a hash of its colors."""
+    digest = hashlib.sha1(bytes(value for color in rgb_palette for value in color)).hexdigest()
+    return f"s4c_palette_{digest[:PALETTE_SYMBOL_DIGITS]}"
+
+def print_heading(mode, target_name, file_version, sizes, s4c_path, **opts):
+    """! Print the actual header for a target.
+    @param opts   shared_palette: a tuple of shared palettes header, palette symbol. If set,
+                  header-exp includes that header instead of declaring its own palette.
+    """
     num_frames = sizes[0]
     num_colors = sizes[1]
     frame_width = sizes[2]
     frame_height = sizes[3]
+    if mode in ('header-fit', 'cfile-fit'):
+        check_fit_colors(target_name, num_colors)
     if mode == "s4c":
         print(f"{file_version}")
     elif mode == "header":
@@ -119,13 +168,98 @@ def print_heading(mode, target_name, file_version, sizes, s4c_path):
         # since we expect them to be the same
         #print(f"extern S4C_Sprite {target_name}[{num_frames}];\n")
         print(f"extern S4C_Sprite {target_name}[{target_name.upper()}_TOT_FRAMES+1];\n")
-        print(f"extern S4C_Color {target_name}_palette[{target_name.upper()}_TOT_COLORS+1];\n")
+        if opts.get("shared_palette"):
+            (palettes_header, symbol) = opts["shared_palette"]
+            print(f"#include \"{palettes_header}\"")
+            print(f"#define {target_name}_palette {symbol}\n")
+        else:
+            print(f"extern S4C_Color {target_name}_palette[{target_name.upper()}_TOT_COLORS+1];\n")
         print(f"\n#endif // {target_name.upper()}_S4C_H_")
         return True
-    elif mode in ('cfile', 'cfile-exp'):
+    elif mode == "header-fit":
+        print_animation_header(target_name, file_version)
+        print(f"#define {target_name.upper()}_TOT_FRAMES {num_frames}")
+        print(f"#define {target_name.upper()}_FRAME_WIDTH {frame_width}")
+        print(f"#define {target_name.upper()}_FRAME_HEIGHT {frame_height}")
+        print(f"extern char {target_name}{fit_dimensions(target_name)};\n")
+        print(f"\n#endif // {target_name.upper()}_S4C_H_")
+        return True
+    elif mode == "header-packed":
+        print_animation_header(target_name, file_version)
+        print_packed_heading(target_name, sizes)
+        print(f"\n#endif // {target_name.upper()}_S4C_H_")
+        return True
+    elif mode in ('cfile', 'cfile-exp', 'cfile-fit', 'cfile-packed'):
         print(f"#include \"{target_name}.h\"\n")
     return False
 
+def fit_dimensions(target_name):
+    """! Returns the array dimensions of the fit modes, sized by the frame macros."""
+    name = target_name.upper()
+    return f"[{name}_TOT_FRAMES+1][{name}_FRAME_HEIGHT][{name}_FRAME_WIDTH+1]"
+
+def packed_dimensions(target_name):
+    """! Returns the array dimensions of the packed modes, sized by the frame macros."""
+    name = target_name.upper()
+    return f"[{name}_TOT_FRAMES][{name}_FRAME_HEIGHT][{name}_ROW_BYTES]"
+
+## The colors the fit modes support: palette index i is char '1'+i, which must fit in a byte.
+FIT_MAX_COLORS = 0x100 - ord('1')
+
+def fit_chars(animation):
+    """! Returns the chars the fit modes need for an animation: one past the highest in use.
+    Chars keep the original palette indexes, as in C-impl, so this is not the compacted size.
+    """
+    ranks = {color: rank for rank, color in enumerate(dict.fromkeys(animation.palette))}
+    return max((ranks[animation.palette[idx]] + 1 for idx in animation.used_indexes()),
+               default=0)
+
+def check_fit_colors(target_name, num_colors):
+    """! Exits if a target needs more chars than the fit modes support, see FIT_MAX_COLORS.
+    @param num_colors   The chars the target needs, see fit_chars().
+    """
+    if num_colors > FIT_MAX_COLORS:
+        print(f"[ERROR] {target_name} uses {num_colors} palette colors, the fit modes support"
+              f" up to {FIT_MAX_COLORS}.", file=sys.stderr)
+        sys.exit(1)
+
+def fit_row(row):
+    """! Escapes the chars past ASCII as octal, so each one takes a single byte of the row.
+    The output is utf-8, where they would take two bytes and overflow FRAME_WIDTH+1.
+    Chars are expected to fit in a byte, see FIT_MAX_COLORS.
+    """
+    return "".join(char if ord(char) < 128 else f"\\{ord(char):03o}" for char in row)
+
+def print_fit_size(target_name, animation, out=sys.stderr):
+    """! Prints the static size of the fit mode array for a target, to stderr by default."""
+    row_size = animation.width + 1
+    total = (len(animation) + 1) * animation.height * row_size
+    print(f"[size] {target_name}: {len(animation)}+1 frames of {animation.height}x{row_size}"
+          f" chars, {total} bytes", file=out)
+
+def print_packed_impl(target_name, animation, out=sys.stderr):
+    """! Print the palette and the packed frames of a target.
+    Reports the size of the frames array to stderr by default.
+    @param target_name The name for the target
+    @param animation The Animation holding the converted frames and their shared palette
+    """
+    bpp = bits_per_pixel(animation.palette_size)
+    print(f"const uint8_t {target_name}_palette[{target_name.upper()}_TOT_COLORS][3] = {{")
+    for color in animation.palette:
+        print(f"\t{{ {color[0]}, {color[1]}, {color[2]} }},")
+    print("};\n")
+    print(f"const uint8_t {target_name}{packed_dimensions(target_name)} = ", "{\n")
+    for idx, frame in enumerate(animation):
+        print(f"\t//Frame {idx}")
+        print("\t{")
+        for row in pack_rows(frame, bpp):
+            print("\t\t{ " + ", ".join(f"0x{value:02x}" for value in row) + " },")
+        print("\t},"+ "\n")
+    print("};")
+    stride = row_bytes(animation.width, bpp)
+    print(f"[size] {target_name}: {len(animation)} frames of {animation.height}x{stride} bytes"
+          f" at {bpp} bpp, {len(animation) * animation.height * stride} bytes", file=out)
+
 def print_palette_as_s4c_color_array(rgb_palette, palette_name):
     """! Takes an rgb palette (r,g,b), and a name for the palette.
     Replaces dashes in palette_name with underscores.
@@ -141,14 +275,14 @@ def print_palette_as_s4c_color_array(rgb_palette, palette_name):
         print(f"\t\t.red = {color[0]},\n\t\t.green = {color[1]},\n\t\t.blue = {color[2]}")
         print("\t},")
 
-def print_impl_ending(mode, target_name, _num_frames, target_sprites):
+def print_impl_ending(mode, target_name, _num_frames, animation, **opts):
     """! Print the actual impl ending for a target.
     Replaces dashes in target_name with underscores.
     @param mode The impl mode
     @param target_name The name for the target
     @param num_frames The number of frames
-    @param target_sprites Array matrix: [conv_chars, frame_width, frame_height,
-                               rgb_palette, palette_size]
+    @param animation The Animation holding the converted frames and their shared palette
+    @param opts   shared_palette: if set, cfile-exp uses the shared palette from the header.
     """
     target_name.replace("-","_")
     if mode == "cfile":
@@ -157,55 +291,112 @@ def print_impl_ending(mode, target_name, _num_frames, target_sprites):
         # since we expect them to be the same
         #print(f"char {target_name}[{num_frames}][MAXROWS][MAXCOLS] = ", "{\n")
         print(f"char {target_name}[{target_name.upper()}_TOT_FRAMES+1][MAXROWS][MAXCOLS] = ", "{\n")
+    elif mode == "cfile-fit":
+        print(f"char {target_name}{fit_dimensions(target_name)} = ", "{\n")
+    elif mode == "cfile-exp" and opts.get("shared_palette"):
+        #The header maps the palette name to the shared one
+        print(f"\nS4C_Sprite {target_name}[{target_name.upper()}_TOT_FRAMES+1] = ", "{\n")
     elif mode == "cfile-exp":
         #s4c_path = args[0]
-        #Using the first sprite's palette since they must be all equal
+        #All frames share the animation palette
         print(f"\nS4C_Color {target_name}_palette[{target_name.upper()}_TOT_COLORS+1] = {{")
-        print_palette_as_s4c_color_array(target_sprites[0][3], target_name)
+        print_palette_as_s4c_color_array(animation.palette, target_name)
         print("};\n")
         #Instead of accurately using the sprite's num of frames, we use the defined macro
         # since we expect them to be the same
         #print(f"\nS4C_Sprite {target_name}[{num_frames}] = ", "{\n")
         print(f"\nS4C_Sprite {target_name}[{target_name.upper()}_TOT_FRAMES+1] = ", "{\n")
 
-    for idx, target in enumerate(target_sprites):
+    for idx, rows in enumerate(animation.encoded_frames()):
         print(f"\t//Frame {idx}")
         if mode == "cfile":
             print("\t{")
-            for row in target[0]:
+            for row in rows:
                 print("\t\t\""+row+"\",")
+        elif mode == "cfile-fit":
+            print("\t{")
+            for row in rows:
+                print("\t\t\""+fit_row(row)+"\",")
         elif mode == "cfile-exp":
             print("\t(S4C_Sprite) {")
             print("\t\t.data = {")
-            for row in target[0]:
+            for row in rows:
                 print("\t\t\t{ \""+row+"\" },")
             print("\t\t},")
             #Instead of accurately using the sprite's height, we use the defined macro
             # since we expect them to be the same
-            #print(f"\t\t.frame_height = {target[2]},")
+            #print(f"\t\t.frame_height = {animation.height},")
             print(f"\t\t.frame_height = {target_name.upper()}_FRAME_HEIGHT,")
             #Instead of accurately using the sprite's width, we use the defined macro
             # since we expect them to be the same
-            #print(f"\t\t.frame_width = {target[1]},")
+            #print(f"\t\t.frame_width = {animation.width},")
             print(f"\t\t.frame_width = {target_name.upper()}_FRAME_WIDTH,")
             print(f"\t\t.palette = &({target_name}_palette[0]),")
 
             #Instead of accurately using the sprite's palette size, we use the defined macro
             # since we expect them to be the same
-            #print(f"\t\t.palette_size = {target[4]},")
+            #print(f"\t\t.palette_size = {animation.palette_size},")
             print(f"\t\t.palette_size = {target_name.upper()}_TOT_COLORS,")
         print("\t},"+ "\n")
     print("};")
 
-def get_converted_char(char_map, r, g, b):
-    """"! Returns a char looking up char_map, for passed color."""
-    if (r, g, b) in char_map:
-        return char_map[(r, g, b)]
-    # Get the closest color in the char_map
-    closest_color = min(char_map,
-                        key=lambda c:
-                        color_distance(c, (r, g, b)))
-    return char_map[closest_color]
+def print_animation(mode, target_name, file_version, animation, s4c_path, **opts):
+    """! Print the output for a converted target, according to mode.
+    @param mode The output mode
+    @param target_name The name for the target
+    @param file_version The file format version
+    @param animation The Animation holding the converted frames
+    @param s4c_path The path to sprites4curses dir (for includes)
+    @param opts   shared_palettes: the shared palettes header. If set, exp modes use the
+                  palette symbol from there instead of their own palette.
+    """
+    if mode in ('header-exp', 'cfile-exp', 'header-packed', 'cfile-packed'):
+        # These modes print their own palette, so only the colors in use are needed
+        animation = animation.compacted()
+    sizes = animation.sizes()
+    if mode in ('header-fit', 'cfile-fit'):
+        # The fit modes ship no palette: chars keep the original indexes, as in C-impl
+        sizes = (sizes[0], fit_chars(animation)) + sizes[2:]
+    shared = None
+    if opts.get("shared_palettes") and mode in ('header-exp', 'cfile-exp'):
+        shared = (opts["shared_palettes"], palette_symbol(animation.palette))
+    if print_heading(mode, target_name, file_version, sizes, s4c_path,
+                     shared_palette=shared):
+        return
+    if mode == "cfile-packed":
+        print_packed_impl(target_name, animation)
+        return
+    print_impl_ending(mode, target_name, len(animation), animation, shared_palette=shared)
+    if mode == "cfile-fit":
+        print_fit_size(target_name, animation)
+
+## The internal mode names, as returned by convert_mode_lit().
+MODES = ('s4c', 'header', 'cfile', 'header-exp', 'cfile-exp', 'header-fit', 'cfile-fit',
+         'header-packed', 'cfile-packed')
+
+def parse_emit(text):
+    """! Parses an --emit value: comma separated <mode>=<path> pairs.
+    Modes are either literals (C-header-exp) or internal names (header-exp).
+    @return  The list of (mode, path), or None if the value is malformed.
+    """
+    outputs = []
+    for item in text.split(","):
+        (mode, sep, path) = item.partition("=")
+        if not sep or not path:
+            print(f"Error: expected <mode>=<path> in --emit, found: {item}")
+            return None
+        if mode not in MODES:
+            mode = convert_mode_lit(mode)
+            if mode == "INVALID":
+                return None
+        outputs.append((mode, path))
+    return outputs
+
+def emit_outputs(outputs, print_func, *args):
+    """! Calls print_func(mode, *args) for each (mode, path) in outputs, writing to path."""
+    for mode, path in outputs:
+        with open(path, "w", encoding="utf-8") as out_fp, contextlib.redirect_stdout(out_fp):
+            print_func(mode, *args)
 
 def new_char_map(rgb_palette):
     """! Creates a new char map for the palette."""
@@ -215,6 +406,8 @@ def new_char_map(rgb_palette):
         if color not in char_map:
             if chr(ord('1') + char_index) == '?':
                 char_map[color] = '\\?'
+            elif chr(ord('1') + char_index) == '\\':
+                char_map[color] = '\\\\'
             else:
                 char_map[color] = chr(ord('1') + char_index)
             char_index += 1
@@ -225,6 +418,25 @@ def log_wrong_argnum(expected, args):
     print(f"Wrong number of arguments. Expected {expected}, got {len(args)-1}.")
     print(f"--> {args[1:]}\n")
 
+def pop_flag(argv, flag):
+    """! Removes every occurrence of an optional flag from the argument list.
+    @param argv   The argument list.
+    @param flag   The flag to look for, e.g. "--stream".
+    @return  A tuple of: flag was found, argument list without the flag.
+    """
+    remaining = [arg for arg in argv if arg != flag]
+    return (len(remaining) != len(argv), remaining)
+
+def pop_option(argv, option):
+    """! Removes an optional "<option> <value>" pair from the argument list.
+    @param argv   The argument list.
+    @param option   The option to look for, e.g. "--jobs".
+    @return  A tuple of: the option value (None if missing), argument list without the pair.
+    """
+    if option not in argv[:-1]:
+        return (None, argv)
+    idx = argv.index(option)
+    return (argv[idx + 1], argv[:idx] + argv[idx + 2:])
 
 def intparse_args(s_spr_w, s_spr_h, s_sep_size, s_start_x, s_start_y):
     """! Parse string arguments as int."""
@@ -0,0 +1,161 @@
+"""! @brief Checks that all the frames of a target share palette and size."""
+
+##
+# @file validate.py
+#
+# @brief Checks that all the frames of a target share palette and size.
+#
+# @section description_validate Description
+# Each frame gets a fingerprint of its palette and dimensions. Frames whose fingerprint
+# matches the first frame's are fine; the others are compared field by field, so the
+# report lists every offending frame and the palette entries that differ, in one run.
+#
+# @section libraries_main Libraries/Modules
+# - functools standard library (https://docs.python.org/3/library/functools.html)
+#   - Access to lru_cache.
+# - hashlib standard library (https://docs.python.org/3/library/hashlib.html)
+#   - Access to blake2b.
+# - json standard library (https://docs.python.org/3/library/json.html)
+#   - Access to report output.
+#
+# @section notes_validate Notes
+# - The first frame is the reference, as in the converters.
+#
+# @section todo_validate TODO
+#
+# @section author_validate Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import functools
+import hashlib
+import json
+from typing import NamedTuple
+from .animation import Animation
+from .animation import MAX_PALETTES
+
+class FrameMismatch(NamedTuple):
+    """! Describes a frame not matching the first one."""
+    index: int
+    source: str
+    what: str
+    expected: object
+    found: object
+    palette_diff: tuple
+
+@functools.lru_cache(maxsize=MAX_PALETTES)
+def palette_digest(palette):
+    """! Returns a digest of a palette, computed once for the frames sharing it."""
+    return hashlib.blake2b(bytes(channel for color in palette for channel in color),
+                           digest_size=16).digest()
+
+def frame_fingerprint(frame):
+    """! Returns a digest of the frame palette and dimensions."""
+    digest = hashlib.blake2b(palette_digest(frame.palette), digest_size=16)
+    digest.update(frame.width.to_bytes(4, "little"))
+    digest.update(frame.height.to_bytes(4, "little"))
+    return digest.digest()
+
+def palette_diff(expected, found):
+    """! Returns ((entry, expected color, found color), ...) for the differing palette entries.
+    Missing entries are reported as None.
+    """
+    diff = []
+    for entry in range(max(len(expected), len(found))):
+        exp_color = expected[entry] if entry < len(expected) else None
+        found_color = found[entry] if entry < len(found) else None
+        if exp_color != found_color:
+            diff.append((entry, exp_color, found_color))
+    return tuple(diff)
+
+def validate_frames(frames, sources):
+    """! Checks every frame against the first one.
+    @param frames   The converted frames.
+    @param sources   A name for each frame (file name, or sprite number), used in the report.
+    @return  The list of FrameMismatch, empty if all frames match.
+    """
+    report = []
+    if not frames:
+        return report
+    reference = frames[0]
+    reference_fp = frame_fingerprint(reference)
+    for idx, frame in enumerate(frames[1:], start=1):
+        if frame_fingerprint(frame) == reference_fp:
+            continue
+        if frame.palette != reference.palette:
+            report.append(FrameMismatch(idx, sources[idx], "palette",
+                                        list(reference.palette), list(frame.palette),
+                                        palette_diff(reference.palette, frame.palette)))
+        if frame.width != reference.width:
+            report.append(FrameMismatch(idx, sources[idx], "width",
+                                        reference.width, frame.width, ()))
+        if frame.height != reference.height:
+            report.append(FrameMismatch(idx, sources[idx], "height",
+                                        reference.height, frame.height, ()))
+    return report
+
+def print_report(report, total):
+    """! Prints every mismatch in the report, then a summary line."""
+    for mismatch in report:
+        where = f"frame #{mismatch.index}: {mismatch.source}"
+        print(f"\n\n[ERROR] at {where}: {mismatch.what} mismatch\n")
+        if mismatch.what == "palette":
+            for entry, expected, found in mismatch.palette_diff:
+                print(f"\tentry #{entry}: expected: {expected}, found: {found}")
+            print("\nAll frames must use the same palette.\n")
+        else:
+            print(f"\texpected: {mismatch.expected}")
+            print(f"\tfound: {mismatch.found}\n")
+            print(f"All frames must have the same {mismatch.what}.\n")
+    bad_frames = len({mismatch.index for mismatch in report})
+    print(f"{bad_frames} of {total} frames don't match the first one.\n")
+
+def write_json_report(report, frames, sources, path):
+    """! Writes the report as JSON to path.
+    @param report   The list of FrameMismatch.
+    @param frames   The validated frames.
+    @param sources   A name for each frame.
+    @param path   The output file.
+    """
+    data = {
+        "frames": len(frames),
+        "reference": None,
+        "mismatches": [
+            {
+                "index": mismatch.index,
+                "source": mismatch.source,
+                "what": mismatch.what,
+                "expected": mismatch.expected,
+                "found": mismatch.found,
+                "palette_diff": [{"entry": entry, "expected": expected, "found": found}
+                                 for entry, expected, found in mismatch.palette_diff],
+            }
+            for mismatch in report
+        ],
+    }
+    if frames:
+        data["reference"] = {
+            "source": sources[0],
+            "width": frames[0].width,
+            "height": frames[0].height,
+            "palette_size": frames[0].palette_size,
+            "fingerprint": frame_fingerprint(frames[0]).hex(),
+        }
+    with open(path, "w", encoding="utf-8") as report_fp:
+        json.dump(data, report_fp, indent=2)
+        report_fp.write("\n")
+
+def validated_animation(frames, sources, report_path=None):
+    """! Checks the frames, then builds their Animation.
+    @param frames   The converted frames.
+    @param sources   A name for each frame.
+    @param report_path   If set, the report is written there as JSON.
+    @return  The Animation, or None after printing the report if some frames don't match.
+    """
+    report = validate_frames(frames, sources) #Must have same palette and size as first sprite
+    if report_path is not None:
+        write_json_report(report, frames, sources, report_path)
+    if report:
+        print_report(report, len(frames))
+        return None
+    return Animation.from_frames(frames)
@@ -0,0 +1,494 @@
+#!/usr/bin/python3
+"""! @brief Program that watches sprites, sheets and palettes, regenerating outputs on change."""
+
+##
+# @file watch.py
+#
+# @brief Program that watches sprites, sheets and palettes, regenerating outputs on change.
+#
+# @section description_watch Description
+# Reads a JSON config listing the targets to watch, and the files to generate for each one:
+#
+#     {
+#       "s4c_path": "../s4c",
+#       "targets": [
+#         { "sprites": "assets/walk-cycle",
+#           "outputs": { "C-header-exp": "src/walk_cycle.h", "C-impl-exp": "src/walk_cycle.c" } },
+#         { "sheet": "assets/my-sheet.png", "geometry": [16, 12, 2, 1, 1],
+#           "outputs": { "C-impl": "src/my_sheet.c" } },
+#         { "palette": "palette.gpl",
+#           "outputs": { "C-header": "src/palette.h", "C-impl": "src/palette.c" } }
+#       ],
+#       "shared_palettes": { "C-header": "src/palettes.h", "C-impl": "src/palettes.c" }
+#     }
+#
+# With shared_palettes, the exp outputs don't print their own palette: each distinct
+# palette is printed once in the shared files, which are rewritten after the targets.
+#
+# Paths are relative to the config file. All outputs are generated once at startup, then
+# again for each target whose sources change. Bursts of saves are debounced, sprite
+# directories only reconvert the frames whose file changed, and an output file is only
+# rewritten when its content changes.
+#
+# Changes are read from inotify on Linux, with a polling fallback elsewhere. Targets are
+# built on a worker thread, one build at a time, so changes are still read during a long
+# conversion: those seen meanwhile are debounced and built together once it's done.
+#
+# @section libraries_main Libraries/Modules
+# - asyncio standard library (https://docs.python.org/3/library/asyncio.html)
+#   - Access to the event loop.
+# - concurrent.futures standard library (https://docs.python.org/3/library/concurrent.futures.html)
+#   - Access to ThreadPoolExecutor.
+# - ctypes standard library (https://docs.python.org/3/library/ctypes.html)
+#   - Access to inotify.
+# - json standard library (https://docs.python.org/3/library/json.html)
+#   - Access to config parsing.
+# - sys standard library (https://docs.python.org/3/library/sys.html)
+#   - Access to command line arguments.
+# - os standard library (https://docs.python.org/3/library/os.html)
+#   - Access to file stats.
+#
+# @section notes_watch Notes
+# - A changed sheet is converted again as a whole.
+#
+# @section todo_watch TODO
+#
+# @section author_watch Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+# Imports
+import abc
+import asyncio
+import contextlib
+import ctypes
+import ctypes.util
+import io
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from .utils import convert_mode_lit
+from .utils import MODES
+from .utils import MODE_LITERALS
+from .utils import print_animation
+from .utils import pop_flag
+from .utils import SheetArgs
+from .animation import Animation
+from .sprites import convert_sprite
+from .sprites import sprite_files
+from .sprites import FILE_VERSION as SPRITES_FILE_VERSION
+from .sheet_converter import sheet_animation
+from .sheet_converter import FILE_VERSION as SHEET_FILE_VERSION
+from .palette import convert_palette
+from .shared_palettes import collect_palettes
+from .shared_palettes import print_shared_palettes
+from .validate import validate_frames
+from .validate import print_report
+
+SCRIPT_VERSION = "0.1.0"
+F_STRING_ARGS = "[--poll] [--debounce <seconds>] <config.json>"
+DEFAULT_DEBOUNCE = 0.3
+POLL_INTERVAL = 0.5
+
+## inotify event masks, see inotify(7).
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+IN_EVENT_HEADER = struct.Struct("iIII")
+
+## Errors a conversion can run into while files are being saved.
+CONVERSION_ERRORS = (OSError, ValueError, AttributeError, IndexError)
+
+# Functions
+def usage():
+    """! Prints correct invocation."""
+    print("Wrong arguments. Needed: config file.")
+    print(f"\nUsage:\tpython {os.path.basename(__file__)} {F_STRING_ARGS}")
+    sys.exit(1)
+
+def file_stamp(path):
+    """! Returns (mtime, size) for path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def capture(func, *args, **kwargs):
+    """! Calls func, returning what it printed to stdout.
+    If func exits, what it printed is an error message: it's printed, then the exit goes on.
+    """
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            func(*args, **kwargs)
+    except SystemExit:
+        print(out.getvalue(), end="")
+        raise
+    return out.getvalue()
+
+def write_if_changed(path, text):
+    """! Writes text to path, unless the file already has the same content.
+    @return  True if the file was written.
+    """
+    try:
+        with open(path, encoding="utf-8") as output_fp:
+            if output_fp.read() == text:
+                return False
+    except OSError:
+        pass
+    with open(path, "w", encoding="utf-8") as output_fp:
+        output_fp.write(text)
+    return True
+
+class Target(abc.ABC):
+    """! Base for a watched source, with the outputs generated from it."""
+    ## The internal modes the target can be rendered in.
+    modes = MODES
+
+    def __init__(self, source, outputs, s4c_path):
+        """! Builds a target.
+        @param source   The watched source path.
+        @param outputs   A dict of mode literal (e.g. "C-impl") to output path.
+        @param s4c_path   The path to sprites4curses dir (for includes).
+        """
+        self.source = source
+        self.outputs = outputs
+        self.s4c_path = s4c_path
+        ## The shared palettes header name, if the exp outputs use shared palettes.
+        self.shared_palettes = None
+        ## The program name in the log lines.
+        self.tag = "watch"
+
+    def watched_dirs(self):
+        """! Returns the directories holding the sources."""
+        return [os.path.dirname(self.source) or "."]
+
+    def owns(self, path):
+        """! Checks if a changed path is one of the sources."""
+        return os.path.normpath(path) == self.source
+
+    @abc.abstractmethod
+    def render(self, mode):
+        """! Returns the output text for the passed internal mode."""
+
+    def prepare(self):
+        """! Converts the sources before rendering. Returns False on errors."""
+        return True
+
+    def build(self):
+        """! Regenerates every output of the target.
+        @return  False if the outputs could not be generated.
+        """
+        try:
+            if not self.prepare():
+                print(f"[{self.tag}] {self.source}: not generating outputs")
+                return False
+            for mode, path in self.outputs.items():
+                text = self.render(convert_mode_lit(mode))
+                if write_if_changed(path, text):
+                    print(f"[{self.tag}] {self.source}: wrote {path}")
+        except CONVERSION_ERRORS as e:
+            print(f"[{self.tag}] {self.source}: {e}")
+            return False
+        except SystemExit:
+            # The converters exit on errors they already printed: keep the other targets going
+            print(f"[{self.tag}] {self.source}: conversion aborted")
+            return False
+        return True
+
+class SpritesTarget(Target):
+    """! A directory of imageN.png frames. Only the changed frames get converted again."""
+
+    def __init__(self, source, outputs, s4c_path):
+        super().__init__(source, outputs, s4c_path)
+        self.target_name = os.path.basename(source).replace("-","_")
+        self.frames = {}
+        self.animation = None
+
+    def watched_dirs(self):
+        return [self.source]
+
+    def owns(self, path):
+        return os.path.dirname(os.path.normpath(path)) == self.source and path.endswith(".png")
+
+    def prepare(self):
+        cached = self.frames
+        self.frames = {}
+        files = sprite_files(self.source)
+        converted = 0
+        for file in files:
+            stamp = file_stamp(file)
+            entry = cached.get(file)
+            if entry is None or entry[0] != stamp:
+                entry = (stamp, convert_sprite(file))
+                converted += 1
+            self.frames[file] = entry
+        print(f"[{self.tag}] {self.source}: converted {converted}/{len(files)} frames")
+        frames = [self.frames[file][1] for file in files]
+        report = validate_frames(frames, files)
+        if report:
+            print_report(report, len(frames))
+            return False
+        self.animation = Animation.from_frames(frames)
+        return len(files) > 0
+
+    def render(self, mode):
+        return capture(print_animation, mode, self.target_name, SPRITES_FILE_VERSION,
+                       self.animation, self.s4c_path, shared_palettes=self.shared_palettes)
+
+class SheetTarget(Target):
+    """! A spritesheet, with its geometry."""
+
+    def __init__(self, source, outputs, s4c_path, geometry):
+        super().__init__(source, outputs, s4c_path)
+        self.target_name = os.path.splitext(os.path.basename(source))[0].replace("-","_")
+        self.geometry = geometry
+        self.animation = None
+
+    def prepare(self):
+        self.animation = sheet_animation(self.source, self.geometry)
+        return self.animation is not None and len(self.animation) > 0
+
+    def render(self, mode):
+        return capture(print_animation, mode, self.target_name, SHEET_FILE_VERSION,
+                       self.animation, self.s4c_path, shared_palettes=self.shared_palettes)
+
+class PaletteTarget(Target):
+    """! A .gpl palette file."""
+    modes = ('header', 'cfile')
+
+    def render(self, mode):
+        return capture(convert_palette, mode, self.source, self.s4c_path)
+
+class SharedPalettesTarget(Target):
+    """! The shared palettes of the targets with exp outputs.
+    Built after them, and again whenever one of them is.
+    """
+
+    def __init__(self, outputs, s4c_path, targets):
+        super().__init__("shared palettes", outputs, s4c_path)
+        self.targets = [target for target in targets
+                        if isinstance(target, (SpritesTarget, SheetTarget))
+                        and any(convert_mode_lit(mode) in ('header-exp', 'cfile-exp')
+                                for mode in target.outputs)]
+        self.palettes = {}
+
+    def watched_dirs(self):
+        return []
+
+    def owns(self, path):
+        return any(target.owns(path) for target in self.targets)
+
+    def prepare(self):
+        self.palettes = collect_palettes(target.animation for target in self.targets
+                                         if target.animation is not None)
+        if self.palettes is None:
+            return False
+        print(f"[{self.tag}] {len(self.palettes)} shared palettes for"
+              f" {len(self.targets)} targets")
+        return True
+
+    def render(self, mode):
+        return capture(print_shared_palettes, mode, self.palettes,
+                       self.outputs["C-header"], self.s4c_path)
+
+def shared_palettes_target(config, base, targets):
+    """! Returns the SharedPalettesTarget for the config shared_palettes entry, or None.
+    Exits if the entry doesn't have both a C-header and a C-impl output.
+    """
+    entry = config.get("shared_palettes")
+    if entry is None:
+        return None
+    if set(entry) != {"C-header", "C-impl"}:
+        print(f"[ERROR] shared_palettes needs a C-header and a C-impl output, found: {entry}")
+        sys.exit(1)
+    outputs = {mode: os.path.join(base, path) for mode, path in entry.items()}
+    shared = SharedPalettesTarget(outputs, config.get("s4c_path", "NONE"), targets)
+    for target in shared.targets:
+        target.shared_palettes = os.path.basename(outputs["C-header"])
+    return shared
+
+def config_target(entry, base, s4c_path):
+    """! Returns the target for a config entry, or None if its kind is unknown."""
+    outputs = {mode: os.path.join(base, path) for mode, path in entry.get("outputs", {}).items()}
+    if "sprites" in entry:
+        return SpritesTarget(os.path.normpath(os.path.join(base, entry["sprites"])), outputs,
+                             s4c_path)
+    if "sheet" in entry:
+        geometry = SheetArgs(*(int(n) for n in entry["geometry"]))
+        return SheetTarget(os.path.normpath(os.path.join(base, entry["sheet"])), outputs,
+                           s4c_path, geometry)
+    if "palette" in entry:
+        return PaletteTarget(os.path.normpath(os.path.join(base, entry["palette"])), outputs,
+                             s4c_path)
+    return None
+
+def check_outputs(target, config_path):
+    """! Checks that a target can be rendered in each of its output modes. Exits if not."""
+    for mode in target.outputs:
+        internal = convert_mode_lit(mode)
+        if internal == "INVALID":
+            print(f"--> In {config_path}, outputs of {target.source}")
+            sys.exit(1)
+        if internal not in target.modes:
+            expected = [lit for lit, name in MODE_LITERALS.items() if name in target.modes]
+            print(f"[ERROR] {config_path}: {target.source} can't be output as {mode},"
+                  f" expected one of: {', '.join(expected)}")
+            sys.exit(1)
+
+def load_config(config_path, tag="watch"):
+    """! Parses the config file into a list of targets. Exits on errors.
+    The shared palettes, if any, come last so that they're built after the other targets.
+    @param tag   The program name in the log lines of the targets.
+    """
+    with open(config_path, encoding="utf-8") as config_fp:
+        config = json.load(config_fp)
+    base = os.path.dirname(os.path.abspath(config_path))
+    targets = []
+    for entry in config.get("targets", []):
+        target = config_target(entry, base, config.get("s4c_path", "NONE"))
+        if target is None:
+            print(f"[ERROR] Unknown target in {config_path}: {entry}")
+            sys.exit(1)
+        check_outputs(target, config_path)
+        targets.append(target)
+    shared = shared_palettes_target(config, base, targets)
+    if shared is not None:
+        targets.append(shared)
+    for target in targets:
+        target.tag = tag
+    return targets
+
+def scan(dirs):
+    """! Returns a dict of path to file_stamp() for every file in dirs."""
+    stamps = {}
+    for direc in dirs:
+        try:
+            with os.scandir(direc) as entries:
+                for entry in entries:
+                    stamps[os.path.join(direc, entry.name)] = file_stamp(entry.path)
+        except OSError:
+            continue
+    return stamps
+
+async def poll_changes(dirs, queue, interval):
+    """! Pushes changed paths to queue, comparing directory scans every interval seconds."""
+    previous = scan(dirs)
+    while True:
+        await asyncio.sleep(interval)
+        current = scan(dirs)
+        for path in previous.keys() | current.keys():
+            if previous.get(path) != current.get(path):
+                queue.put_nowait(path)
+        previous = current
+
+def inotify_open(dirs):
+    """! Returns (fd, watch descriptor to dir) for an inotify instance watching dirs.
+    Returns None if inotify is not available.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    watches = {}
+    for direc in dirs:
+        wd = libc.inotify_add_watch(fd, os.fsencode(direc), IN_WATCH_MASK)
+        if wd < 0:
+            os.close(fd)
+            return None
+        watches[wd] = direc
+    return (fd, watches)
+
+def read_inotify(fd, watches, queue):
+    """! Reads pending inotify events, pushing the changed paths to queue."""
+    try:
+        data = os.read(fd, 64 * 1024)
+    except BlockingIOError:
+        return
+    offset = 0
+    while offset + IN_EVENT_HEADER.size <= len(data):
+        wd, _, _, name_len = IN_EVENT_HEADER.unpack_from(data, offset)
+        offset += IN_EVENT_HEADER.size
+        name = data[offset:offset + name_len].rstrip(b"\0")
+        offset += name_len
+        if wd in watches and name:
+            queue.put_nowait(os.path.join(watches[wd], os.fsdecode(name)))
+
+def build_changed(targets, changed):
+    """! Rebuilds, in order, the targets owning one of the changed paths."""
+    for target in targets:
+        if any(target.owns(path) for path in changed):
+            target.build()
+
+async def dispatch(targets, queue, debounce, builder):
+    """! Waits for changes, then rebuilds the affected targets once the burst is over.
+    @param builder   The single worker executor running the builds. The loop keeps queueing
+                     changes during a build: they are coalesced into the next one.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        changed = {await queue.get()}
+        while True:
+            try:
+                changed.add(await asyncio.wait_for(queue.get(), debounce))
+            except asyncio.TimeoutError:
+                break
+        await loop.run_in_executor(builder, build_changed, targets, changed)
+
+async def watch(targets, debounce, poll):
+    """! Builds every target, then keeps them up to date."""
+    for target in targets:
+        target.build()
+    dirs = sorted({direc for target in targets for direc in target.watched_dirs()})
+    queue = asyncio.Queue()
+    inotify = None if poll else inotify_open(dirs)
+    builder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="watch-build")
+    try:
+        if inotify is None:
+            print(f"[watch] Polling {len(dirs)} directories.")
+            await asyncio.gather(dispatch(targets, queue, debounce, builder),
+                                 poll_changes(dirs, queue, POLL_INTERVAL))
+            return
+        print(f"[watch] Watching {len(dirs)} directories.")
+        (fd, watches) = inotify
+        asyncio.get_running_loop().add_reader(fd, read_inotify, fd, watches, queue)
+        try:
+            await dispatch(targets, queue, debounce, builder)
+        finally:
+            asyncio.get_running_loop().remove_reader(fd)
+            os.close(fd)
+    finally:
+        builder.shutdown(wait=False)
+
+def main(argv):
+    """! Main program entry."""
+    args = argv[1:]
+    if len(args) == 1 and args[0] in ('version', '-v', '--version'):
+        print(f"watch v{SCRIPT_VERSION}")
+        sys.exit(0)
+    poll, args = pop_flag(args, "--poll")
+    debounce = DEFAULT_DEBOUNCE
+    if len(args) == 3 and args[0] == "--debounce":
+        debounce = float(args[1])
+        args = args[2:]
+    if len(args) != 1:
+        print(f"Wrong number of arguments. Expected 1, got {len(args)}.")
+        print(f"--> {args}\n")
+        usage()
+    targets = load_config(args[0])
+    try:
+        asyncio.run(watch(targets, debounce, poll))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main(sys.argv)
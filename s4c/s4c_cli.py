@@ -41,12 +41,17 @@ from .core.palette import main as palette_main
 from .core.sprites import main as sprites_main
 from .core.sheet_converter import main as sheet_converter_main
 from .core.png_resize import main as png_resize_main
+from .core.watch import main as watch_main
+from .core.atlas import main as pack_main
+from .core.batch import main as batch_main
+from .core.merge import main as merge_main
 
 S4C_CLI_VERSION = "0.1.4"
 
 EXPECTED_S4C_ANIMATE_V = "0.4.8"
 
-subcoms = ["cut_sheet", "palette", "sprites", "sheet_converter", "png_resize", "help", "version"]
+subcoms = ["cut_sheet", "palette", "sprites", "sheet_converter", "png_resize", "watch",
+           "pack", "batch", "merge", "help", "version"]
 F_PROG_STR = f"{os.path.basename(__file__)}"
 F_USAGE_STR = f"\nUsage:\tpython {F_PROG_STR} <subcommand>"
 F_STRING_S4C_CLI_V = f"s4c-cli v{S4C_CLI_VERSION}"
@@ -76,6 +81,14 @@ def run_subcommand(query,args):
         sheet_converter_main(args)
     elif query == "png_resize":
         png_resize_main(args)
+    elif query == "watch":
+        watch_main(args)
+    elif query == "pack":
+        pack_main(args)
+    elif query == "batch":
+        batch_main(args)
+    elif query == "merge":
+        merge_main(args)
     else:
         print("Unreachable!")
         usage()
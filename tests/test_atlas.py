@@ -0,0 +1,74 @@
+"""! @brief Tests for converting animations packed in an atlas."""
+
+##
+# @file test_atlas.py
+#
+# @brief Tests for converting animations packed in an atlas.
+#
+# @section description_test_atlas Description
+# Packs indexed sprites directories in an atlas, and checks that converting an animation
+# from the atlas gives the same output as converting its sprites directory.
+#
+# @section author_test_atlas Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+from s4c.core.atlas import pack_atlas
+from s4c.core.sheet_converter import convert_atlas_animation
+from s4c.core.sprites import print_converted_sprites
+
+## A 256 colors palette with no duplicate colors.
+PALETTE = [channel for idx in range(256) for channel in (idx, (idx * 7) % 256, (idx * 13) % 256)]
+
+def write_sprites(directory, palette, transparent_frame=None):
+    """! Writes four indexed 6x4 sprites, using indexes from 100 on.
+    @param transparent_frame   If set, the frame number with a transparent color.
+    """
+    os.makedirs(directory)
+    for number in range(1, 5):
+        img = Image.new('P', (6, 4))
+        img.putpalette(palette)
+        img.putdata([100 + (number * x + y * 5) % 16 for y in range(4) for x in range(6)])
+        if number == transparent_frame:
+            img.info["transparency"] = 100
+        img.save(os.path.join(directory, f"image{number}.png"))
+
+def captured(call, *args, **opts):
+    """! Returns what a call prints."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        call(*args, **opts)
+    return output.getvalue()
+
+class AtlasTest(unittest.TestCase):
+    """! Checks atlas animations convert as their sprites directories."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.walk = os.path.join(self.directory, "walk")
+        self.jump = os.path.join(self.directory, "jump")
+        # Only a later frame is transparent: the atlas is RGBA
+        write_sprites(self.walk, PALETTE, transparent_frame=3)
+        write_sprites(self.jump, PALETTE[::-1][:128 * 3])
+        self.index = os.path.join(self.directory, "game.json")
+        captured(pack_atlas, os.path.join(self.directory, "game.png"), [self.walk, self.jump])
+
+    def test_indexed_animations(self):
+        """! Indexed frames keep their palette indexes, with and without --stream."""
+        for (name, path) in (("walk", self.walk), ("jump", self.jump)):
+            for mode in ("cfile", "cfile-exp", "cfile-fit", "cfile-packed"):
+                expected = captured(print_converted_sprites, mode, path, "NONE")
+                for stream in (False, True):
+                    with self.subTest(name=name, mode=mode, stream=stream):
+                        self.assertEqual(captured(convert_atlas_animation, mode, self.index,
+                                                  name, "NONE", stream=stream), expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""! @brief Tests for the C-header-fit and C-impl-fit output modes."""
+
+##
+# @file test_fit_modes.py
+#
+# @brief Tests for the C-header-fit and C-impl-fit output modes.
+#
+# @section description_test_fit_modes Description
+# Converts indexed sprites with C-impl and C-impl-fit, and checks the frames use the same
+# chars: the fit modes ship no palette, so their chars must still index the sprite palette.
+#
+# @section author_test_fit_modes Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+from s4c.core.sprites import print_converted_sprites
+
+## A 256 colors palette with no duplicate colors.
+PALETTE = [channel for idx in range(256) for channel in (idx, (idx * 7) % 256, (idx * 13) % 256)]
+
+def write_sprites(directory, frames, width):
+    """! Writes each frame, a list of palette indexes, as an indexed sprite using PALETTE."""
+    for number, indexes in enumerate(frames, start=1):
+        img = Image.new('P', (width, len(indexes) // width))
+        img.putpalette(PALETTE)
+        img.putdata(indexes)
+        img.save(os.path.join(directory, f"image{number}.png"))
+
+def frame_rows(mode, directory):
+    """! Converts the sprites of a directory, and returns the printed frame rows."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        print_converted_sprites(mode, directory)
+    return [line.strip() for line in output.getvalue().splitlines()
+            if line.startswith('\t\t"')]
+
+class FitModesTest(unittest.TestCase):
+    """! Checks the fit modes against C-impl."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_indexed_sprite_keeps_indexes(self):
+        """! Sprites using a few colors of a larger palette get the C-impl chars."""
+        write_sprites(self.directory, [[3, 7, 7, 3, 7, 7, 7, 3, 3, 7, 3, 3], [7] * 12], 6)
+        rows = frame_rows("cfile-fit", self.directory)
+        self.assertEqual(rows, frame_rows("cfile", self.directory))
+        self.assertEqual(rows[:2], ['"488488",', '"844844",'])
+
+    def test_last_supported_index(self):
+        """! Index 206 is the last one the fit modes support: its char is escaped as octal."""
+        write_sprites(self.directory, [[0, 206, 206, 0]], 4)
+        self.assertEqual(frame_rows("cfile-fit", self.directory), ['"1\\377\\3771",'])
+
+    def test_index_past_a_byte(self):
+        """! Sprites using index 207 are rejected, their char would not fit in a byte."""
+        write_sprites(self.directory, [[0, 207, 207, 0]], 4)
+        for mode in ("cfile-fit", "header-fit"):
+            with self.assertRaises(SystemExit):
+                frame_rows(mode, self.directory)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""! @brief Tests for the C-header-packed and C-impl-packed output modes."""
+
+##
+# @file test_packed.py
+#
+# @brief Tests for the C-header-packed and C-impl-packed output modes.
+#
+# @section description_test_packed Description
+# Converts indexed sprites using 2, 4, 16 and 256 colors, so they're packed at 1, 2, 4
+# and 8 bits per pixel, then reads the outputs back with unpack_outputs() and checks they
+# hold the converted palette and index planes.
+#
+# @section author_test_packed Author(s)
+# - Created by jgabaut on 19/10/2026.
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+from s4c.core.packed import bits_per_pixel
+from s4c.core.packed import unpack_outputs
+from s4c.core.sprites import print_converted_sprites
+from s4c.core.sprites import sprites_animation
+
+## Frame width, not a multiple of the pixels in a byte, so rows end with padding bits.
+WIDTH = 7
+HEIGHT = 3
+
+def write_sprites(directory, num_colors):
+    """! Writes three indexed sprites, together using every color of a num_colors palette."""
+    palette = [channel for idx in range(num_colors)
+               for channel in (idx, (idx * 7) % 256, (idx * 13) % 256)]
+    pixels = WIDTH * HEIGHT
+    for number in range(3):
+        img = Image.new('P', (WIDTH, HEIGHT))
+        img.putpalette(palette)
+        img.putdata([(number * pixels + idx * 5) % num_colors for idx in range(pixels)])
+        img.save(os.path.join(directory, f"image{number + 1}.png"))
+
+def captured(mode, directory):
+    """! Returns what print_converted_sprites() prints for a mode."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        print_converted_sprites(mode, directory)
+    return output.getvalue()
+
+class PackedTest(unittest.TestCase):
+    """! Checks the packed outputs round trip through unpack_outputs()."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_round_trip(self):
+        """! The unpacked palette and index planes are the converted ones, at every bpp."""
+        for (num_colors, bpp) in ((2, 1), (4, 2), (16, 4), (256, 8)):
+            with self.subTest(bpp=bpp):
+                sprites = os.path.join(self.directory, f"sprites{bpp}")
+                os.makedirs(sprites)
+                write_sprites(sprites, num_colors)
+                animation = sprites_animation(sprites)[1].compacted()
+                self.assertEqual(bits_per_pixel(animation.palette_size), bpp)
+                (palette, planes) = unpack_outputs(captured("header-packed", sprites),
+                                                   captured("cfile-packed", sprites))
+                self.assertEqual(palette, list(animation.palette))
+                self.assertEqual(planes, [frame.indexes for frame in animation])
+
+if __name__ == "__main__":
+    unittest.main()